@@ -0,0 +1,53 @@
+# coding: utf-8
+# helpers that turn many small shapes into one triangle_strip call.
+# shapes are joined with degenerate triangles, so everything in one strip shares the current fill.
+from math import pi
+import numpy as np
+
+def quad_strip(xs, ys, size, x = 0.0, y = 0.0):
+	# squares of side size with their lower left corners at (x + xs[i], y + ys[i])
+	strip = []
+	for i in range(len(xs)):
+		x0 = x + xs[i]
+		y0 = y + ys[i]
+		x1 = x0 + size
+		y1 = y0 + size
+		if strip:
+			strip.append(strip[-1])
+			strip.append((x0, y0))
+		strip += [(x0, y0), (x1, y0), (x0, y1), (x1, y1)]
+	return strip
+
+def disc_order(segments):
+	# corners of a regular polygon in triangle strip order: 0, 1, n-1, 2, n-2, ...
+	order = [0]
+	for k in range(1, segments//2 + 1):
+		order.append(k)
+		if segments - k != k:
+			order.append(segments - k)
+	return order
+
+unit_discs = {} # segments -> corners of the unit polygon in strip order, first and last repeated
+
+def disc_corners(segments):
+	corners = unit_discs.get(segments)
+	if corners is None:
+		angles = np.array(disc_order(segments))*(2*pi/segments)
+		corners = np.stack((np.cos(angles), np.sin(angles)), axis = -1)
+		corners = unit_discs[segments] = np.concatenate((corners[:1], corners, corners[-1:]))
+	return corners
+
+def disc_strip(xs, ys, radius, segments = 10, out = None):
+	# polygons approximating circles of the given radius (a number, or an array with one per circle) centered at
+	# (xs[i], ys[i]), as an (N, 2) array. xs and ys are numpy arrays; every polygon is repeated at both ends to
+	# make the joins. out is an array of at least len(xs)*(segments + 2) rows to build it in, the result is a view
+	corners = disc_corners(segments)
+	n = len(xs)
+	k = len(corners)
+	if out is None:
+		out = np.empty((n*k, 2))
+	points = out[:n*k].reshape(n, k, 2)
+	np.multiply(corners[None, :, :], np.reshape(radius, (-1, 1, 1)), out = points)
+	points[:, :, 0] += np.reshape(xs, (-1, 1))
+	points[:, :, 1] += np.reshape(ys, (-1, 1))
+	return out[1:n*k - 1]
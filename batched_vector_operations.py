@@ -0,0 +1,90 @@
+# coding: utf-8
+# the functions of vector_operations for whole (N, 2) numpy arrays of vectors at once.
+# the arithmetic follows the scalar versions step by step, so every row comes out the same as calling them one vector at a time.
+# a single vector (shape (2,)) is broadcast against the other argument.
+from math import sin as _sin, cos as _cos
+import numpy as np
+
+def as_vectors(v):
+	return np.asarray(v, dtype = float)
+
+def dot(v1, v2):
+	v1 = as_vectors(v1)
+	v2 = as_vectors(v2)
+	return v1[..., 0]*v2[..., 0] + v1[..., 1]*v2[..., 1]
+
+def cross(v1, v2):
+	# z component of the 3d cross product of 2d vectors
+	v1 = as_vectors(v1)
+	v2 = as_vectors(v2)
+	return v1[..., 0]*v2[..., 1] - v1[..., 1]*v2[..., 0]
+
+def rotate(vec, angle):
+	# angle is one angle for every vector or an (N,) array
+	vec = as_vectors(vec)
+	if np.ndim(angle) == 0:
+		c = _cos(angle)
+		s = _sin(angle)
+	else:
+		c = np.cos(angle)
+		s = np.sin(angle)
+	x = vec[..., 0]
+	y = vec[..., 1]
+	return np.stack((x*c - y*s, x*s + y*c), axis = -1)
+
+def reflect(v, surface_normal):
+	v = as_vectors(v)
+	n = as_vectors(surface_normal)
+	x = n[..., 0]
+	y = n[..., 1]
+	# same rule as the scalar version: normals within .001 of unit length get normalized
+	unit = np.abs(x**2 + y**2 - 1.0) < .001
+	length = np.sqrt(x*x + y*y)
+	n = np.where(unit[..., None], n/np.where(length == 0, 1, length)[..., None], n)
+	return v - (2*dot(v, n))[..., None]*n
+
+def solve(start1, vec1, start2, vec2):
+	# start1 + vec1*dist1 = start2 + vec2*dist2 for every row.
+	# returns (dist1, dist2, solved). rows the scalar solve returns None for are nan with solved False,
+	# and so are rows where it would divide by zero. raises ValueError if any vector has no length, like solve
+	s1 = as_vectors(start1)
+	v1 = as_vectors(vec1)
+	s2 = as_vectors(start2)
+	v2 = as_vectors(vec2)
+	s1, v1, s2, v2 = np.broadcast_arrays(s1, v1, s2, v2)
+	s1x, s1y = s1[..., 0], s1[..., 1]
+	v1x, v1y = v1[..., 0], v1[..., 1]
+	s2x, s2y = s2[..., 0], s2[..., 1]
+	v2x, v2y = v2[..., 0], v2[..., 1]
+	if np.any((v1x == 0) & (v1y == 0)) or np.any((v2x == 0) & (v2y == 0)):
+		raise ValueError("Both vectors must have length")
+	general = (v2y != 0) & (v1x != 0)
+	case2 = ~general & (v1x == 0) & (v2y == 0)
+	with np.errstate(divide = "ignore", invalid = "ignore"):
+		# case 3 and general case
+		k = v2x/v2y
+		g1 = (s2x/v1x + k*s1y/v1x - k*s2y/v1x - s1x/v1x)/(1 - k*v1y/v1x)
+		g2 = (v1y*g1 + s1y - s2y)/v2y
+		# case 2
+		c1 = (v2y*s1x/v2x - v2y*s2x/v2x + s2y - s1y)/(v1y - v2y*v1x/v2x)
+		c2 = (s1x + v1x*c1 - s2x)/v2x
+	dist1 = np.where(general, g1, np.where(case2, c1, np.nan))
+	dist2 = np.where(general, g2, np.where(case2, c2, np.nan))
+	solved = np.isfinite(dist1) & np.isfinite(dist2)
+	return np.where(solved, dist1, np.nan), np.where(solved, dist2, np.nan), solved
+
+def ray_circle(starts, directions, centers, radii):
+	# where the lines start + t*direction meet circles. returns (t_enter, t_exit, hit):
+	# hit is False where the line misses the circle or direction has no length,
+	# t is in units of direction, so with the step from one frame to the next as direction, 0 to 1 covers the step
+	f = as_vectors(starts) - as_vectors(centers)
+	d = as_vectors(directions)
+	radii = np.asarray(radii, dtype = float)
+	a = dot(d, d)
+	b = 2*dot(f, d)
+	c = dot(f, f) - radii*radii
+	disc = b*b - 4*a*c
+	hit = (a > 0) & (disc >= 0)
+	root = np.sqrt(np.where(hit, disc, 0))
+	a2 = np.where(hit, 2*a, 1)
+	return np.where(hit, (-b - root)/a2, np.nan), np.where(hit, (-b + root)/a2, np.nan), hit
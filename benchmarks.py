@@ -0,0 +1,250 @@
+# coding: utf-8
+# timings of the hot paths, headless (see headless.py), to tell whether a change made things faster or slower.
+#
+#	python benchmarks.py                   runs everything and compares with benchmark_baseline.json
+#	python benchmarks.py --save            ... and keeps the results as the new baseline
+#	python benchmarks.py --threshold=.25   flags only what got more than 25% worse (15% by default)
+#	python benchmarks.py --runs=5          measures everything 5 times and keeps the best
+#	python benchmarks.py stars particles   only the benchmarks whose names start with these
+#
+# every benchmark is a setup function that returns the operation to time. ops/sec is the best of a few batches, each
+# sized to take about min_time/repeats. allocations are traced with tracemalloc in a run of their own: the bytes an op
+# leaves allocated, and the peak over the run on top of what was there before. a benchmark that got slower or
+# allocates more than threshold beyond its baseline is flagged, and the exit status is 1.
+# baselines are only comparable on the machine they were made on, which is saved with them along with the command.
+import headless
+headless.install()
+
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import random
+from collections import OrderedDict
+from itertools import count
+import numpy as np
+
+from scene import *
+from vehicles import *
+from celestials import *
+from simulation import HeadlessGame
+from vector_operations import solve, reflect
+from render import *
+
+root = os.path.dirname(os.path.abspath(__file__))
+baseline_path = os.path.join(root, "benchmark_baseline.json")
+
+def scattered(n, seed = 0, spread = 200000):
+	# n planets strewn around the origin, none of them near it
+	rng = random.Random(seed)
+	planets = []
+	while len(planets) < n:
+		x = (rng.random() - .5)*spread
+		y = (rng.random() - .5)*spread
+		if abs(x) > 2000 or abs(y) > 2000:
+			planets.append(Planet(x, y, radius = 20 + rng.random()*200, color = (.5, .5, .5)))
+	return planets
+
+def ship_update(n):
+	# one integration step with gravity from n celestials
+	ship = HeadlessGame(scattered(n)).vehicle
+	m = ship.give_movement()
+	return lambda: ship.update(m)
+
+def ship_step(contact):
+	# a whole physics tick. in contact the ship sits a few units deep in a planet, so every tick bounces
+	planets = scattered(100)
+	if contact:
+		planets.append(Planet(0, -240, radius = 200, color = (.5, .5, .5)))
+	game = HeadlessGame(planets)
+	ship = game.vehicle
+	start = ship.give_movement()
+	def step():
+		ship.set_movement(start)
+		ship.step()
+	return step
+
+def ship_geometry():
+	# world space sprite quad and collision hull for a new movement
+	ship = HeadlessGame().vehicle
+	def geometry():
+		ship._movement = None
+		m = ship.give_movement()
+		ship.get_vertices(m)
+		ship.get_collision(m)
+	return geometry
+
+def stars_draw():
+	# the star field over a view 20 screens across, sections already generated
+	game = HeadlessGame(bounds = Rect(0, 0, 20480, 15360))
+	stars = Stars(game, seed = 1)
+	stars.draw()
+	return stars.draw
+
+def star_sections():
+	# generating new star sections
+	xs = count()
+	return lambda: StarSection(next(xs)*150.0, 0.0, 150.0, 150.0, 7)
+
+def vector_operations():
+	a = Vector2(1, 2)
+	b = Vector2(3, -1)
+	c = Vector2(-2, 5)
+	d = Vector2(1, 1)
+	normal = Vector2(0, 1)
+	def ops():
+		solve(a, b, c, d)
+		reflect(b, normal)
+	return ops
+
+def particles():
+	# a thrusting ship's flames: emit, move and draw
+	pool = ParticlePool(256, seed = 1)
+	xs = [0.0, 10.0, 20.0]
+	ys = [0.0, 0.0, 5.0]
+	dxs = [0.0, 0.0, 1.0]
+	dys = [-1.0, -1.0, 0.0]
+	def churn():
+		pool.emit(xs, ys, dxs, dys)
+		pool.update()
+		pool.draw()
+	return churn
+
+def frame(backend):
+	# recording and submitting a frame of the view around the ship
+	game = HeadlessGame(scattered(2000, spread = 20000), bounds = Rect(0, 0, 4096, 3072))
+	game.vehicle.accelerating = True
+	game.step(10)
+	return lambda: game.render(backend)
+
+benchmarks = [
+	("ship_update_10", lambda: ship_update(10)),
+	("ship_update_100", lambda: ship_update(100)),
+	("ship_update_10000", lambda: ship_update(10000)),
+	("ship_step_free", lambda: ship_step(False)),
+	("ship_step_contact", lambda: ship_step(True)),
+	("ship_geometry", ship_geometry),
+	("stars_draw", stars_draw),
+	("star_sections", star_sections),
+	("vector_operations", vector_operations),
+	("particles", particles),
+	("frame_scene", lambda: frame(SceneBackend())),
+	("frame_pil", lambda: frame(PILBackend(1024, 768))),
+]
+
+def batch(op, number):
+	start = time.perf_counter()
+	for i in range(number):
+		op()
+	return time.perf_counter() - start
+
+def measure(op, min_time = .5, repeats = 5):
+	# ops per second, best of repeats batches
+	number = 1
+	while batch(op, number) < min_time/repeats/2:
+		number *= 2
+	return number/min(batch(op, number) for i in range(repeats)), number
+
+def allocations(op, number):
+	# (bytes left allocated per op, peak bytes above the start) over number ops
+	op()
+	tracemalloc.start()
+	before = tracemalloc.get_traced_memory()[0]
+	tracemalloc.reset_peak()
+	for i in range(number):
+		op()
+	current, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	return max(current - before, 0)/float(number), peak - before
+
+def run(names = None, min_time = .5, runs = 1):
+	# with runs > 1 every benchmark is measured that many times and the best kept, for machines that are noisy
+	results = OrderedDict()
+	for name, setup in benchmarks:
+		if names and not any(name.startswith(n) for n in names):
+			continue
+		op = setup()
+		ops, number = max(measure(op, min_time) for i in range(runs))
+		retained, peak = allocations(op, min(number, 200))
+		results[name] = OrderedDict([("ops_per_sec", ops), ("retained_bytes", retained), ("peak_bytes", peak)])
+	return results
+
+def cpu_model():
+	# platform.processor() is empty on most linux systems, /proc/cpuinfo has the model
+	if os.path.exists("/proc/cpuinfo"):
+		with open("/proc/cpuinfo") as f:
+			for line in f:
+				if line.startswith("model name"):
+					return line.split(":", 1)[1].strip()
+	return platform.processor()
+
+def machine():
+	return OrderedDict([("python", platform.python_version()), ("numpy", np.__version__), ("platform", platform.platform()),
+		("processor", platform.machine()), ("cpu", cpu_model()), ("cpus", os.cpu_count())])
+
+def compare(results, baseline, threshold = .15):
+	# name -> what got worse than baseline by more than threshold
+	flags = OrderedDict()
+	for name, r in results.items():
+		b = baseline.get(name)
+		if b == None:
+			continue
+		found = []
+		if r["ops_per_sec"] < b["ops_per_sec"]*(1 - threshold):
+			found.append("%.0f%% slower" % (100*(1 - r["ops_per_sec"]/b["ops_per_sec"])))
+		# small absolute slack, so a few bytes more of nothing much doesn't count
+		if r["retained_bytes"] > b["retained_bytes"]*(1 + threshold) + 64:
+			found.append("retains %.0f bytes per op, was %.0f" % (r["retained_bytes"], b["retained_bytes"]))
+		if r["peak_bytes"] > b["peak_bytes"]*(1 + threshold) + 4096:
+			found.append("peaks at %d bytes, was %d" % (r["peak_bytes"], b["peak_bytes"]))
+		if found:
+			flags[name] = found
+	return flags
+
+def load_baseline(path = baseline_path):
+	if not os.path.exists(path):
+		return None
+	with open(path) as f:
+		return json.load(f)
+
+def save_baseline(results, path = baseline_path, command = None):
+	# with the machine and the command line it was made with, so it can be made again the same way
+	if command == None:
+		command = " ".join(["python", os.path.basename(sys.argv[0])] + sys.argv[1:])
+	made = OrderedDict([("machine", machine()), ("command", command), ("date", time.strftime("%Y-%m-%d %H:%M:%S"))])
+	made["results"] = results
+	with open(path, "w") as f:
+		json.dump(made, f, indent = 1)
+
+if __name__ == "__main__":
+	args = sys.argv[1:]
+	threshold = .15
+	runs = 1
+	for arg in args:
+		if arg.startswith("--threshold="):
+			threshold = float(arg.split("=", 1)[1])
+		elif arg.startswith("--runs="):
+			runs = int(arg.split("=", 1)[1])
+	names = [arg for arg in args if not arg.startswith("--")]
+	results = run(names, runs = runs)
+	baseline = load_baseline()
+	flags = {}
+	if baseline != None:
+		if baseline["machine"] != machine():
+			print("baseline is from another machine (%s), comparing anyway" % baseline["machine"]["platform"])
+		flags = compare(results, baseline["results"], threshold)
+	for name, r in results.items():
+		b = baseline["results"].get(name) if baseline != None else None
+		change = "%+6.1f%%" % (100*(r["ops_per_sec"]/b["ops_per_sec"] - 1)) if b != None else "new"
+		print("%-20s %14.1f ops/s %8s %10.1f B/op retained %10d B peak  %s" % (name, r["ops_per_sec"], change,
+			r["retained_bytes"], r["peak_bytes"], "REGRESSION: " + ", ".join(flags[name]) if name in flags else ""))
+	if "--save" in args:
+		if names and baseline != None:
+			# keep the baselines of the benchmarks that weren't run
+			baseline["results"].update(results)
+			results = baseline["results"]
+		save_baseline(results)
+		print("saved as the baseline")
+	sys.exit(1 if flags else 0)
@@ -0,0 +1,107 @@
+# coding: utf-8
+# pixel accurate contact between a sprite and circles. the sprite's alpha mask is rotated to a number of evenly
+# spaced angles once, packed 64 pixels to a word and kept as .npy in graphics/masks/, memory mapped when loaded.
+# a test takes the mask nearest the sprite's angle, rasterizes the circle row by row into words in that mask's
+# frame and ANDs them: only the rows the circle covers are looked at, a few words each.
+# the frames are in world orientation, centered on the sprite, with one sprite pixel per frame pixel
+import os
+from math import sin, cos, pi, floor, ceil
+import numpy as np
+from PIL import Image
+
+from imageanalysis import root, image_hash, alpha_mask
+
+cache_dir = os.path.join(root, "graphics", "masks")
+
+word = 64
+# low_bits[n] is a word with its lowest n bits set
+low_bits = np.array([(1 << n) - 1 for n in range(word + 1)], dtype = np.uint64)
+
+def rotate_mask(mask, angle, side):
+	# mask (row 0 at the bottom) turned counterclockwise by angle about its center, into a side x side frame
+	h, w = mask.shape
+	c = np.arange(side) + .5 - side/2.0
+	fx, fy = np.meshgrid(c, c)
+	# the sprite pixel each frame pixel shows: turn back by angle
+	sx = np.floor(cos(angle)*fx + sin(angle)*fy + w/2.0).astype(int)
+	sy = np.floor(-sin(angle)*fx + cos(angle)*fy + h/2.0).astype(int)
+	inside = (sx >= 0) & (sx < w) & (sy >= 0) & (sy < h)
+	frame = np.zeros((side, side), dtype = bool)
+	frame[inside] = mask[sy[inside], sx[inside]]
+	return frame
+
+def pack(masks):
+	# (..., side) bools to (..., words) 64 bit words, pixel x in bit x % 64 of word x // 64
+	side = masks.shape[-1]
+	words = -(-side//word)
+	padded = np.zeros(masks.shape[:-1] + (words*word,), dtype = bool)
+	padded[..., :side] = masks
+	return np.packbits(padded, axis = -1, bitorder = "little").view("<u8")
+
+def unpack(rows, side):
+	return np.unpackbits(np.ascontiguousarray(rows, dtype = "<u8").view(np.uint8), axis = -1, bitorder = "little")[..., :side]
+
+def spans(x0, x1, base):
+	# one row of words per span, with the bits of pixels x0 up to (not including) x1 set. base is the first pixel of each word
+	lo = np.clip(x0[:, None] - base, 0, word)
+	hi = np.clip(x1[:, None] - base, 0, word)
+	return low_bits[hi] & ~low_bits[lo]
+
+class RotatedMasks (object):
+	# the sprite at path (relative to the game's folder), drawn size world units wide, at rotations angles
+	def __init__(self, path, size, rotations = 256, threshold = 128):
+		full = os.path.join(root, path)
+		w, h = Image.open(full).size
+		self.side = int(ceil(np.hypot(w, h))) + 2 # holds the sprite at any angle
+		self.scale = size/float(w) # world units per pixel
+		self.rotations = rotations
+		name = os.path.join(cache_dir, "%s-%d-%d.npy" % (image_hash(full), rotations, threshold))
+		if os.path.exists(name):
+			self.masks = np.load(name, mmap_mode = "r")
+		else:
+			mask = alpha_mask(full, threshold)
+			self.masks = pack(np.array([rotate_mask(mask, 2*pi*k/rotations, self.side) for k in range(rotations)]))
+			try:
+				if not os.path.isdir(cache_dir):
+					os.makedirs(cache_dir)
+				np.save(name, self.masks)
+				self.masks = np.load(name, mmap_mode = "r")
+			except (IOError, OSError):
+				# a read only install keeps them in memory instead
+				pass
+		# a plain array on the same memory: slicing a memmap is slow
+		self.masks = np.asarray(self.masks)
+		self.words = self.masks.shape[-1]
+		self.base = np.arange(self.words)*word
+	def index(self, angle):
+		return int(round(angle/(2*pi)*self.rotations)) % self.rotations
+	def rows(self, center, angle, circle, radius):
+		# (first row, ANDed rows) of the frame where the sprite at center turned by angle overlaps the circle.
+		# a pixel is covered by the circle when its center is
+		side = self.side
+		cx = (circle[0] - center[0])/self.scale + side/2.0
+		cy = (circle[1] - center[1])/self.scale + side/2.0
+		r = radius/self.scale
+		y0 = max(int(floor(cy - r)), 0)
+		y1 = min(int(ceil(cy + r)), side)
+		if y0 >= y1 or cx + r < 0 or cx - r > side:
+			return y0, None
+		dy = np.arange(y0, y1) + .5 - cy
+		half = np.sqrt(np.maximum(r*r - dy*dy, 0.0))
+		x0 = np.clip(np.ceil(cx - half - .5), 0, side).astype(int)
+		x1 = np.clip(np.floor(cx + half - .5) + 1, 0, side).astype(int)
+		return y0, self.masks[self.index(angle), y0:y1] & spans(x0, x1, self.base)
+	def overlaps(self, center, angle, circle, radius):
+		y0, rows = self.rows(center, angle, circle, radius)
+		return rows is not None and bool(rows.any())
+	def contact(self, center, angle, circle, radius):
+		# world position of the overlapping pixel deepest in the circle, None if they don't overlap
+		y0, rows = self.rows(center, angle, circle, radius)
+		if rows is None or not rows.any():
+			return None
+		hit = np.nonzero(rows.any(axis = 1))[0]
+		ys, xs = np.nonzero(unpack(rows[hit], self.side))
+		wx = center[0] + (xs + .5 - self.side/2.0)*self.scale
+		wy = center[1] + (hit[ys] + y0 + .5 - self.side/2.0)*self.scale
+		i = np.argmin((wx - circle[0])**2 + (wy - circle[1])**2)
+		return float(wx[i]), float(wy[i])
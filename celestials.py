@@ -1,12 +1,19 @@
 from scene import *
-from math import pi
+from math import pi, sin, cos, floor, acos, atan2
 from colorsys import hsv_to_rgb
+from collections import OrderedDict
+from array import array
 import random
+import numpy as np
 
 from basic_objects import *
+from batched_drawing import *
+from render import *
 
 g = .0003
 
+impostor_size = 4 # celestials smaller than this many pixels on screen are drawn as squares
+
 valid_landing_angle = 2*pi*(5.0/360.0)
 planet_land_delay = 10 # number of frames touching a planet before considered landed on that planet
 deltat_for_impulse = 1/60.0
@@ -27,45 +34,103 @@ max_moon_mass = 17
 min_moon_num = -3
 max_moon_num = 5
 
+mass_unit = 10000.0 # the masses above are in units of this many celestial mass units
+
+def distribution(x):
+	d = abs(x - 1.5)
+	if d < .1:
+		n = 1
+	elif d < .2:
+		n = 3
+	elif d < .40:
+		n = 5
+	else:
+		n = 7
+	return ((x*2 - 1)**n + 1)/2.0
+
+def generate(min, max, rng = random):
+	l = max - min
+	return min + l*distribution(rng.random())
+
+# distribution skew:
+# for example a planet with a higher mass would have the bell curve scooted over so that it would have more moons more often than a planet with less mass, which would have less moons far more often (almost always 0 for a small planet)
+# then say for that small planet which happened to spawn a moon, it will spawn small, because of the skewing of the original spawn
+# so skewing will inherit among class delegation for the solar system generation classes.
+
+def skewed(min, max, skew, rng = random):
+	# generate() with the bell curve scooted over by skew (-1 to 1) times the range
+	l = max - min
+	return min + l*(distribution(rng.random()) + skew/2.0)
+
+def mix_seed(*values):
+	# combine integers into one 32 bit seed, the same on every run and platform
+	h = 2166136261
+	for v in values:
+		h = ((h ^ (int(v) & 0xffffffff))*16777619) & 0xffffffff
+	return h
+
 class StarSection (object):
-	def __init__(self, x, y, w, h):
-		random.seed(x+y + (2*x + 3)^(3*y + 2))
-		self.stars = []
-		for i in range(random.randint(2,4)):
-			brightness = .5 + random.random()/2.0
-			pos = Point(x + random.random()*w, y + random.random()*h)
-			self.stars.append((brightness, pos))
-	def draw(self):
-		for s in self.stars:
-			fill(s[0])
-			ellipse(s[1].x, s[1].y, 1.5, 1.5)
+	def __init__(self, x, y, w, h, seed = 0):
+		# every section has its own random stream, so the global random module is left alone
+		rng = random.Random(mix_seed(seed, x, y))
+		count = rng.randint(2,4)
+		self.brightness = .5 + rng.random()/2.0
+		# float32 offsets from the section's corner: absolute positions would lose precision far from the origin
+		self.x = x
+		self.y = y
+		self.xs = array("f", [rng.random()*w for i in range(count)])
+		self.ys = array("f", [rng.random()*h for i in range(count)])
+	def draw(self, star_size = 1.5):
+		fill(self.brightness)
+		triangle_strip(quad_strip(self.xs, self.ys, star_size, self.x, self.y))
 
 class Stars (DrawableGameObject):
-	def __init__(self, game):
+	def __init__(self, game, seed = 0, max_sections = 1024, max_visible = 512):
 		self.game = game
+		self.seed = seed
 		self.density = 150.0
-		self.stars = {}
+		self.max_sections = max_sections # least recently drawn sections are dropped beyond this
+		self.max_visible = max_visible # zoomed out further than this many sections, coarser sections are used
+		self.sections = OrderedDict() # (level, x, y) -> StarSection
 	def snap(self, rect, snapto):
 		snapto = float(snapto)
-		start = Point(int(rect.min_x/snapto), int(rect.min_y/snapto))*snapto
-		end = Point(int(rect.max_x/snapto)+1, int(rect.max_y/snapto)+1)*snapto
+		start = Point(floor(rect.min_x/snapto), floor(rect.min_y/snapto))*snapto
+		end = Point(floor(rect.max_x/snapto)+1, floor(rect.max_y/snapto)+1)*snapto
 		size = Size(end.x - start.x, end.y - start.y)
 		return Rect(start.x, start.y, size.w, size.h)
+	def level(self, rect):
+		# level of detail: each level doubles the section size, so a section aggregates the area of four of the level below.
+		# the star count per section stays the same, which thins the stars out when zoomed out
+		level = 0
+		size = self.density
+		while ((rect.w/size + 3)*(rect.h/size + 3)) > self.max_visible:
+			level += 1
+			size *= 2
+		return level, size
 	def draw(self):
-		r = self.snap(self.game.view_rect.inset(-self.density, -self.density), self.density)
-		for x in range(int(r.x), int(r.max_x), int(self.density)):
-			for y in range(int(r.y), int(r.max_y), int(self.density)):
-				good = False
-				if x in self.stars:
-					if y in self.stars[x]:
-						good = True
-				if not good:
-					if x not in self.stars:
-						self.stars[x] = {}
-					self.stars[x][y] = StarSection(x, y, self.density, self.density)
-				self.stars[x][y].draw()
+		level, size = self.level(self.game.view_rect)
+		r = self.snap(self.game.view_rect.inset(-size, -size), size)
+		sections = self.sections
+		star_size = 1.5*2**level # keep stars the same size on screen
+		stroke_weight(0)
+		for i in range(int(round(r.w/size))):
+			x = r.x + i*size
+			for j in range(int(round(r.h/size))):
+				y = r.y + j*size
+				key = (level, x, y)
+				section = sections.get(key)
+				if section == None:
+					section = StarSection(x, y, size, size, mix_seed(self.seed, level))
+					sections[key] = section
+				else:
+					sections.move_to_end(key)
+				section.draw(star_size)
+		while len(sections) > self.max_sections:
+			sections.popitem(last = False)
 
 class Celestial (DrawableGameObject):
+	color = (.6, .6, .6)
+	path = None # a Path to move along, for bodies on rails
 	def __init__(self, x, y, radius = None, mass = None, density = .01):
 		self.position = Point(x, y)
 		self.density = density
@@ -77,6 +142,19 @@ class Celestial (DrawableGameObject):
 		if radius == None:
 			self.mass = mass
 			self.radius = self.calc_radius()
+	def drawobject(self, pixel_scale = 1.0):
+		self.draw(pixel_scale)
+	def draw(self, pixel_scale = 1.0):
+		# pixel_scale is screen pixels per world unit.
+		# bodies smaller than impostor_size pixels are drawn as a square of at least one pixel instead of an ellipse
+		stroke_weight(0)
+		fill(self.color)
+		size = self.radius*2
+		if size*pixel_scale < impostor_size:
+			size = max(size, 1.0/pixel_scale)
+			rect(self.position.x - size/2.0, self.position.y - size/2.0, size, size)
+		else:
+			ellipse(self.position.x - self.radius, self.position.y - self.radius, size, size)
 	def calc_force(self, other_pos, mass):
 		v = self.position - other_pos
 		length = abs(v)
@@ -92,10 +170,11 @@ class Celestial (DrawableGameObject):
 		for p in pts:
 			if abs(p - self.position) <= self.radius:
 				return True
-	def valid_landing(self, center, up):
+	def valid_landing(self, center, up, max_angle = valid_landing_angle):
+		# whether a ship at center with up as its up vector stands upright on the surface
 		out = center - self.position
 		out = out/abs(out)
-		return acos(out.x * vert.x + out.y * vert.y) < valid_landing_angle
+		return acos(max(-1.0, min(1.0, out.x * up.x + out.y * up.y))) < max_angle
 	def landed_pos(self, center, height):
 		out = center - self.position
 		nout = out/abs(out)
@@ -103,62 +182,308 @@ class Celestial (DrawableGameObject):
 		return (self.position + nout*(self.radius + height/2.0), angle)
 
 class Path (object):
-	def __init__(self, path, speed = .01):
+	def __init__(self, path, speed = .01, center = None):
 		# path is a function that takes one float parameter between 0 and 1
 		# this function must return a scene.Point object
 		# this function must be cyclic -> position at 1 equals position at 0
+		# center is None or a body the positions are relative to, so the path moves along with it
 		self.path = path
 		self.speed = speed
 		self.progress = 0
+		self.phase = 0 # progress at time 0, for paths driven by the game time (see rails.py)
+		self.center = center
+	def position(self, progress):
+		p = self.path(progress % 1.0)
+		if self.center != None:
+			p = p + self.center.position
+		return p
+	def offsets(self, progress):
+		# positions relative to the center for an array of progress values, as an (N, 2) array
+		return np.array([(p.x, p.y) for p in (self.path(t % 1.0) for t in np.ravel(progress))]).reshape(-1, 2)
 	def next_position(self):
 		self.progress += self.speed
-		return self.path(self.progress)
+		return self.position(self.progress)
 	def look_next(self):
-		return self.path(self.progress + self.speed)
+		return self.position(self.progress + self.speed)
 	def look_previous(self):
-		return self.path(self.progress - self.speed)
+		return self.position(self.progress - self.speed)
 	def current(self):
-		return self.path(self.progress)
+		return self.position(self.progress)
+
+class SampledPath (Path):
+	# a path sampled once over its whole cycle; positions in between are interpolated linearly
+	def __init__(self, path, speed = .01, center = None, samples = 256):
+		Path.__init__(self, self.lookup, speed, center)
+		self.samples = samples
+		table = [path(k/float(samples)) for k in range(samples)]
+		table.append(table[0])
+		self.table = np.array([(p.x, p.y) for p in table])
+	def offsets(self, progress):
+		u = np.mod(progress, 1.0)*self.samples
+		i = np.minimum(u.astype(int), self.samples - 1)
+		f = (u - i)[..., None]
+		return self.table[i]*(1 - f) + self.table[i + 1]*f
+	def lookup(self, progress):
+		x, y = self.offsets(np.array([progress]))[0]
+		return Point(float(x), float(y))
+
+def eccentric_anomaly(mean, e, iterations = 6):
+	# solves kepler's equation mean = E - e*sin(E) for floats or arrays
+	if not np.any(e):
+		# circular orbits: E is the mean anomaly
+		return mean
+	big_e = mean + e*np.sin(mean)
+	for i in range(iterations):
+		big_e = big_e - (big_e - e*np.sin(big_e) - mean)/(1 - e*np.cos(big_e))
+	return big_e
+
+class KeplerPath (Path):
+	# an ellipse around center with semi-major axis a and eccentricity e, its periapsis in direction argument.
+	# progress is the mean anomaly over 2*pi: one cycle takes period ticks. direction is 1 for counterclockwise
+	def __init__(self, center, a, e = 0.0, argument = 0.0, period = 1000.0, direction = 1):
+		Path.__init__(self, self.lookup, 1.0/period, center)
+		self.a = a
+		self.e = e
+		self.argument = argument
+		self.direction = direction
+	@classmethod
+	def circular(cls, center, position, g = g):
+		# the circular orbit through position around center, whose pull per unit of mass is g*center.mass
+		offset = position - center.position
+		a = abs(offset)
+		period = 2*pi*(a**3/(g*center.mass))**.5
+		return cls(center, a, 0.0, atan2(offset.y, offset.x), period)
+	def offsets(self, progress):
+		big_e = eccentric_anomaly(2*pi*np.asarray(progress, dtype = float), self.e)
+		x = self.a*(np.cos(big_e) - self.e)
+		y = self.direction*self.a*(1 - self.e*self.e)**.5*np.sin(big_e)
+		c = cos(self.argument)
+		s = sin(self.argument)
+		return np.stack((c*x - s*y, s*x + c*y), axis = -1)
+	def lookup(self, progress):
+		x, y = self.offsets(progress)
+		return Point(float(x), float(y))
 
 class SolarSystemSpawner (object):
-	pass
-	
+	# streams the universe in square chunks of chunk_size, with chunk (0, 0) centered on the origin.
+	# a chunk's solar system is generated from the seed the first time the chunk comes near the view or the ship,
+	# and dropped again when more than max_chunks chunks are loaded and it hasn't been near for the longest.
+	# generating a chunk again gives the same system, so nothing has to be kept for far away chunks.
+	# the chunks within gravity_range of the ship are loaded as soon as they're needed, so a system never starts
+	# pulling on the ship from closer than that. the view only adds chunks within view_range of the ship, nearest
+	# first and at most max_loads an update, so zooming far out doesn't generate a whole sky of systems in one frame
+	def __init__(self, game, seed, chunk_size = 64000.0, max_chunks = 16, load_margin = 8000.0, system_chance = .6, clear_radius = 3000.0, orbits = False,
+			gravity_range = 32000.0, view_range = 128000.0, max_loads = 1):
+		self.game = game
+		self.orbits = orbits # put planets and moons on rails
+		self.seed = seed
+		self.chunk_size = float(chunk_size)
+		self.max_chunks = max_chunks
+		self.load_margin = load_margin
+		self.system_chance = system_chance
+		self.clear_radius = clear_radius # nothing spawns this close to the origin, where the ship starts
+		self.gravity_range = gravity_range
+		self.view_range = view_range
+		self.max_loads = max_loads
+		self.chunks = OrderedDict() # (cx, cy) -> SolarSystem or None, least recently used first
+	def chunk_of(self, x, y):
+		s = self.chunk_size
+		return int(floor(x/s + .5)), int(floor(y/s + .5))
+	def chunks_in(self, min_x, min_y, max_x, max_y):
+		x0, y0 = self.chunk_of(min_x, min_y)
+		x1, y1 = self.chunk_of(max_x, max_y)
+		return [(cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)]
+	def update(self, view_rect, position):
+		x = position.x
+		y = position.y
+		r = self.gravity_range
+		needed = self.chunks_in(x - r, y - r, x + r, y + r)
+		m = self.load_margin
+		v = self.view_range
+		s = self.chunk_size
+		near = set(needed)
+		seen = [key for key in self.chunks_in(max(view_rect.min_x - m, x - v), max(view_rect.min_y - m, y - v),
+			min(view_rect.max_x + m, x + v), min(view_rect.max_y + m, y + v)) if key not in near]
+		seen.sort(key = lambda key: (key[0]*s - x)**2 + (key[1]*s - y)**2)
+		seen = seen[:max(self.max_chunks - len(needed), 0)]
+		loads = 0
+		# the ship's chunks last, so they're the most recently used
+		for key in seen:
+			if key in self.chunks:
+				self.chunks.move_to_end(key)
+			elif loads < self.max_loads:
+				self.load(key)
+				loads += 1
+		for key in needed:
+			if key in self.chunks:
+				self.chunks.move_to_end(key)
+			else:
+				self.load(key)
+		if len(self.chunks) > self.max_chunks:
+			near.update(seen)
+			for key in list(self.chunks):
+				if len(self.chunks) <= self.max_chunks:
+					break
+				if key not in near:
+					self.unload(key)
+	def load(self, key):
+		system = self.generate_chunk(*key)
+		self.chunks[key] = system
+		if system != None:
+			if self.orbits:
+				system.set_orbits()
+			self.game.add_system(system)
+	def unload(self, key):
+		system = self.chunks.pop(key)
+		if system != None:
+			self.game.remove_system(system)
+	def unload_all(self):
+		for key in list(self.chunks):
+			self.unload(key)
+	def generate_chunk(self, cx, cy):
+		rng = random.Random(mix_seed(self.seed, cx, cy))
+		home = (cx, cy) == (0, 0)
+		if not home and rng.random() > self.system_chance:
+			return None
+		planets = int(round(generate(min_planet_num, max_planet_num, rng)))
+		max_radius = self.chunk_size/2.0 - self.load_margin
+		if home:
+			# the ship starts out between the orbits of the home system
+			sun_position = Point(0, -max_radius/3.0)
+		else:
+			spread = self.chunk_size/2.0 - max_radius
+			sun_position = Point(cx*self.chunk_size + rng.uniform(-spread, spread), cy*self.chunk_size + rng.uniform(-spread, spread))
+		generator = SolarSystemGenerator(rng.getrandbits(32), sun_position, planets, max_radius)
+		return generator.generate(Point(0, 0), self.clear_radius)
+
 class SolarSystemGenerator (object):
-	def __init__(self, seed, sun_position, planets):
-		pass
-	
+	def __init__(self, seed, sun_position, planets, max_radius = 30000.0):
+		self.seed = seed
+		self.sun_position = sun_position
+		self.planets = planets
+		self.max_radius = max_radius # no planet or moon orbits further out than this
+	def generate(self, clear_position = None, clear_radius = 0):
+		# bodies that would overlap the clear circle are left out
+		rng = random.Random(self.seed)
+		sun = SunGenerator(rng.getrandbits(32)).generate(self.sun_position)
+		if clear_position != None and abs(sun.position - clear_position) < sun.radius + clear_radius:
+			return None
+		systems = []
+		orbit = sun.radius
+		gap = (self.max_radius - sun.radius)/float(max(self.planets, 1))
+		for i in range(self.planets):
+			system = PlanetMoonSystemGenerator(rng.getrandbits(32)).generate()
+			orbit += system.extent + gap*rng.uniform(.3, .7)
+			if orbit + system.extent > self.max_radius:
+				break
+			angle = rng.random()*2*pi
+			system.translate(self.sun_position + Point(cos(angle), sin(angle))*orbit)
+			orbit += system.extent
+			if clear_position != None and system.overlaps(clear_position, clear_radius):
+				continue
+			systems.append(system)
+		return SolarSystem(sun, systems)
+
 class SunGenerator (object):
-	pass
-	
+	def __init__(self, seed):
+		self.seed = seed
+	def generate(self, position):
+		rng = random.Random(self.seed)
+		mass = generate(min_sun_mass, max_sun_mass, rng)*mass_unit
+		color = hsv_to_rgb(.02 + rng.random()*.12, .7 + rng.random()*.3, 1)
+		return Sun(position.x, position.y, mass = mass, color = color)
+
 class PlanetMoonSystemGenerator (object):
-	pass
-	
+	def __init__(self, seed):
+		self.seed = seed
+	def generate(self):
+		# builds the system around (0, 0); move it into place with PlanetMoonSystem.translate
+		rng = random.Random(self.seed)
+		planet = PlanetGenerator(rng.getrandbits(32)).generate(Point(0, 0))
+		# heavier planets get more and heavier moons
+		skew = (planet.mass/mass_unit - min_planet_mass)/float(max_planet_mass - min_planet_mass)*2 - 1
+		moons = []
+		count = int(round(skewed(min_moon_num, max_moon_num, skew, rng)))
+		orbit = planet.radius
+		for i in range(max(count, 0)):
+			moon = MoonGenerator(rng.getrandbits(32)).generate(Point(0, 0), skew)
+			orbit += moon.radius*rng.uniform(2, 4)
+			angle = rng.random()*2*pi
+			moon.position = Point(cos(angle), sin(angle))*(orbit + moon.radius)
+			orbit += moon.radius*2
+			moons.append(moon)
+		return PlanetMoonSystem(planet, moons)
+
 class PlanetGenerator (object):
-	pass
+	def __init__(self, seed):
+		self.seed = seed
+	def generate(self, position):
+		rng = random.Random(self.seed)
+		mass = generate(min_planet_mass, max_planet_mass, rng)*mass_unit
+		return Planet(position.x, position.y, mass = mass, color = hsv_to_rgb(rng.random(), .6, .6))
 
 class MoonGenerator (object):
-	pass
-	
+	def __init__(self, seed):
+		self.seed = seed
+	def generate(self, position, skew = 0):
+		rng = random.Random(self.seed)
+		mass = min(max(skewed(min_moon_mass, max_moon_mass, skew, rng), min_moon_mass), max_moon_mass)*mass_unit
+		grey = .4 + rng.random()*.3
+		return Moon(position.x, position.y, mass = mass, color = (grey, grey, grey))
+
 class Sun (Celestial):
-	pass
+	def __init__(self, *args, **kwargs):
+		color = kwargs.pop("color", None)
+		Celestial.__init__(self, *args, **kwargs)
+		self.color = color if color != None else hsv_to_rgb(.02 + random.random()*.12, .8, 1)
 
 class Planet (Celestial):
 	def __init__(self, *args, **kwargs):
+		biome = kwargs.pop("biome", None)
+		color = kwargs.pop("color", None)
 		Celestial.__init__(self, *args, **kwargs)
-		if "biome" in kwargs:
-			self.biome = kwargs["biome"]
-		self.color = hsv_to_rgb(random.random(), .6, .6)
-	def draw(self):
-		stroke_weight(0)
-		fill(self.color)
-		ellipse(self.position.x - self.radius, self.position.y - self.radius, self.radius*2, self.radius*2)
-		
+		if biome != None:
+			self.biome = biome
+		self.color = color if color != None else hsv_to_rgb(random.random(), .6, .6)
 	
 class Moon (Celestial):
-	pass
+	def __init__(self, *args, **kwargs):
+		color = kwargs.pop("color", None)
+		Celestial.__init__(self, *args, **kwargs)
+		self.color = color if color != None else (.55, .55, .55)
 	
 class SolarSystem (DrawableGameObject):
-	pass
+	def __init__(self, sun, planet_systems):
+		self.sun = sun
+		self.planet_systems = planet_systems
+	def bodies(self):
+		bodies = [self.sun]
+		for system in self.planet_systems:
+			bodies += system.bodies()
+		return bodies
+	def set_orbits(self, g = g):
+		# puts the planets on circular orbits around the sun and the moons on circular orbits around their planet,
+		# starting from where they are now
+		for system in self.planet_systems:
+			system.planet.path = KeplerPath.circular(self.sun, system.planet.position, g)
+			for moon in system.moons:
+				moon.path = KeplerPath.circular(system.planet, moon.position, g)
 	
 class PlanetMoonSystem (DrawableGameObject):
-	pass
+	def __init__(self, planet, moons):
+		self.planet = planet
+		self.moons = moons
+	def bodies(self):
+		return [self.planet] + self.moons
+	@property
+	def extent(self):
+		# radius of the circle around the planet that holds the whole system
+		return max(abs(body.position - self.planet.position) + body.radius for body in self.bodies())
+	def translate(self, offset):
+		for body in self.bodies():
+			body.position = body.position + offset
+	def overlaps(self, position, radius):
+		for body in self.bodies():
+			if abs(body.position - position) < body.radius + radius:
+				return True
+		return False
@@ -0,0 +1,42 @@
+# coding: utf-8
+# continuous collision of moving points against circles.
+# every point moves in a straight line from its position last tick (start) to its position this tick (end).
+import numpy as np
+
+import batched_vector_operations as bvo
+
+def hull_array(points):
+	return np.array([(p[0], p[1]) for p in points], dtype = float)
+
+def swept_circle(starts, ends, center, radius):
+	# starts and ends are (N, 2) arrays. returns (hit, t_enter) arrays:
+	# hit is True for points that end inside the circle or cross it on the way,
+	# t_enter is where along the path (0 = start, 1 = end) the line through the path enters the circle.
+	# it's negative for points that were inside already, which puts the entry point behind the start
+	t_enter, t_exit, crossing = bvo.ray_circle(starts, ends - starts, center, radius)
+	e = ends - center
+	end_inside = bvo.dot(e, e) <= radius*radius
+	crosses = crossing & (t_enter >= 0) & (t_enter <= 1)
+	return end_inside | crosses, np.where(crossing, t_enter, 0)
+
+def first_contact(starts, ends, center, radius):
+	# earliest point to touch the circle: (index, time of impact, contact point, contact normal), or None.
+	# the contact point is on the circle where the point's path enters it, the normal points out of the circle there
+	center = np.asarray(center, dtype = float)
+	hit, t_enter = swept_circle(starts, ends, center, radius)
+	if not hit.any():
+		return None
+	toi = np.where(hit, np.maximum(t_enter, 0), np.inf)
+	i = int(np.argmin(toi))
+	start = starts[i]
+	d = ends[i] - start
+	if d[0] == 0 and d[1] == 0:
+		# the point didn't move; push it out the shortest way
+		out = start - center
+		length = np.hypot(out[0], out[1])
+		normal = out/length if length > 0 else np.array([0.0, 1.0])
+		contact = center + normal*radius
+	else:
+		contact = start + d*t_enter[i]
+		normal = (contact - center)/radius
+	return i, float(toi[i]), (float(contact[0]), float(contact[1])), (float(normal[0]), float(normal[1]))
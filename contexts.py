@@ -1,5 +1,6 @@
 from basic_objects import *
 from scene import *
+from render import *
 
 class Button (object):
 	def __init__(self, x, y, pressed_func, diameter = 80, draw = None, image = None):
@@ -1 +1,2 @@
 debug = True
+profile = False # time the phases of every frame, see profiler.py
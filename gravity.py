@@ -0,0 +1,237 @@
+# coding: utf-8
+from math import floor, sqrt
+from collections import OrderedDict
+import numpy as np
+from scene import Vector2
+
+from celestials import g
+
+class CelestialField (object):
+	# positions, masses and radii of celestials in contiguous arrays,
+	# so the gravity of every body can be summed in one numpy call.
+	# forces follow Celestial.calc_force: g*mass*other_mass/distance**2 towards the body
+	block_size = 1000000 # max number of ship-body pairs computed at once by calc_forces
+	def __init__(self, celestials = (), g = g):
+		self.g = g
+		self.n = 0
+		self.positions = np.zeros((8, 2))
+		self.masses = np.zeros(8)
+		self.radii = np.zeros(8)
+		self.moving = np.zeros(8, dtype = bool) # bodies that have been moved with move, like those on rails
+		self.bodies = []
+		self.index = {}
+		self.version = 0 # goes up whenever a body is added, removed or changed, or starts moving
+		self.moves = 0 # goes up whenever move moves bodies
+		self.moved_bodies = None
+		self.moved_version = None
+		self.moved_index = None
+		for c in celestials:
+			self.add(c)
+	def __len__(self):
+		return self.n
+	def _grow(self):
+		size = len(self.masses)*2
+		positions = np.zeros((size, 2))
+		positions[:self.n] = self.positions[:self.n]
+		masses = np.zeros(size)
+		masses[:self.n] = self.masses[:self.n]
+		radii = np.zeros(size)
+		radii[:self.n] = self.radii[:self.n]
+		moving = np.zeros(size, dtype = bool)
+		moving[:self.n] = self.moving[:self.n]
+		self.positions, self.masses, self.radii, self.moving = positions, masses, radii, moving
+	def add(self, celestial):
+		if self.n == len(self.masses):
+			self._grow()
+		i = self.n
+		self.index[id(celestial)] = i
+		self.moving[i] = False
+		self.bodies.append(celestial)
+		self.n += 1
+		self.update(celestial)
+	def remove(self, celestial):
+		# move the last body into the hole so the arrays stay contiguous
+		i = self.index.pop(id(celestial))
+		last = self.n - 1
+		if i != last:
+			moved = self.bodies[last]
+			self.bodies[i] = moved
+			self.index[id(moved)] = i
+			self.positions[i] = self.positions[last]
+			self.masses[i] = self.masses[last]
+			self.radii[i] = self.radii[last]
+			self.moving[i] = self.moving[last]
+		self.bodies.pop()
+		self.n = last
+		self.version += 1
+	def update(self, celestial):
+		# call after a body's position, mass or radius changed
+		i = self.index[id(celestial)]
+		self.positions[i] = (celestial.position.x, celestial.position.y)
+		self.masses[i] = celestial.mass
+		self.radii[i] = celestial.radius
+		self.version += 1
+	def move(self, bodies, positions):
+		# new positions for many bodies at once; positions is an (N, 2) array in the order of bodies.
+		# only the first move of a body changes version, after that just moves goes up,
+		# so caches can keep what the bodies that stand still add up to (see FieldCache)
+		# the same bodies come every tick, so their indices are kept until the field changes
+		if bodies is not self.moved_bodies or self.version != self.moved_version:
+			self.moved_index = np.array([self.index[id(body)] for body in bodies], dtype = int)
+			self.moved_bodies = bodies
+		i = self.moved_index
+		self.positions[i] = positions
+		if not self.moving[i].all():
+			self.moving[i] = True
+			self.version += 1
+		self.moved_version = self.version
+		self.moves += 1
+	def clear(self):
+		self.n = 0
+		self.bodies = []
+		self.index = {}
+		self.version += 1
+	def calc_force(self, other_pos, mass):
+		# summed force of all bodies on one object, as a Vector2
+		if self.n == 0:
+			return Vector2(0, 0)
+		d = self.positions[:self.n] - (other_pos[0], other_pos[1])
+		r2 = np.einsum("ij,ij->i", d, d)
+		f = (self.g*mass)*self.masses[:self.n]/(r2*np.sqrt(r2))
+		fx, fy = np.dot(f, d)
+		return Vector2(float(fx), float(fy))
+	def timescale(self, other_pos, mass):
+		# shortest free fall time scale, sqrt(distance/acceleration), over all bodies. None without bodies
+		if self.n == 0:
+			return None
+		d = self.positions[:self.n] - (other_pos[0], other_pos[1])
+		r2 = np.einsum("ij,ij->i", d, d)
+		return float(np.sqrt(np.min(r2*np.sqrt(r2)/((self.g*mass)*self.masses[:self.n]))))
+	def dominant(self, other_pos, mass):
+		# the body pulling hardest on an object, and how strong the pull of all the others is compared to it.
+		# returns (body, perturbation), or (None, None) without bodies
+		if self.n == 0:
+			return None, None
+		d = self.positions[:self.n] - (other_pos[0], other_pos[1])
+		r2 = np.einsum("ij,ij->i", d, d)
+		f = (self.g*mass)*self.masses[:self.n]/r2
+		i = int(np.argmax(f))
+		forces = d*(f/np.sqrt(r2))[:, None]
+		rest = forces.sum(axis = 0) - forces[i]
+		return self.bodies[i], float(np.hypot(rest[0], rest[1])/f[i])
+	def calc_forces(self, positions, masses):
+		# summed forces on a batch of objects:
+		# positions is an (M, 2) array, masses a scalar or an (M,) array. returns an (M, 2) array
+		positions = np.asarray(positions, dtype = float).reshape(-1, 2)
+		forces = np.zeros_like(positions)
+		if self.n == 0:
+			return forces
+		bodies = self.positions[:self.n]
+		gm = self.g*self.masses[:self.n]
+		rows = max(1, self.block_size//self.n)
+		for start in range(0, len(positions), rows):
+			d = bodies[None, :, :] - positions[start:start + rows, None, :]
+			r2 = np.einsum("ijk,ijk->ij", d, d)
+			f = gm/(r2*np.sqrt(r2))
+			forces[start:start + rows] = np.einsum("ij,ijk->ik", f, d)
+		return forces*np.reshape(masses, (-1, 1))
+
+class FieldCache (object):
+	# gravity of a field whose bodies stay put, precomputed on grids so lookups don't depend on the body count.
+	# the world is cut into square tiles. the bodies within exact_distance of a tile (measured from their surface)
+	# are always summed exactly for points in it; the pull of all the others is sampled on a grid the first time
+	# the tile is needed and interpolated bilinearly. so close to a surface the force is exact,
+	# and far from everything it's a handful of multiplications.
+	# moving bodies (those on rails) are left out of the tiles and summed exactly on every lookup, so moving them
+	# costs nothing here. any other change to the field throws every tile away. everything but calc_force is
+	# passed on to the field
+	def __init__(self, field, tile_size = 4000, resolution = 32, exact_distance = 1000, max_tiles = 64):
+		self.field = field
+		self.tile_size = float(tile_size)
+		self.resolution = resolution # grid cells along a tile side
+		self.spacing = self.tile_size/resolution
+		self.exact_distance = exact_distance
+		self.max_tiles = max_tiles
+		self.tiles = OrderedDict() # (tx, ty) -> (x, y, grid, near bodies), least recently used first
+		self.version = None # of the field the tiles were built for
+		self.movers = None # indices of the moving bodies, None without any
+		self.hits = 0
+		self.misses = 0
+	def __getattr__(self, name):
+		return getattr(self.field, name)
+	def __len__(self):
+		return len(self.field)
+	def tile(self, tx, ty):
+		if self.version != self.field.version:
+			field = self.field
+			self.tiles.clear()
+			self.version = field.version
+			movers = np.nonzero(field.moving[:field.n])[0]
+			self.movers = movers if len(movers) else None
+			self.mover_gm = field.g*field.masses[movers]
+		key = (tx, ty)
+		tile = self.tiles.get(key)
+		if tile == None:
+			self.misses += 1
+			tile = self.tiles[key] = self.build(tx, ty)
+			if len(self.tiles) > self.max_tiles:
+				self.tiles.popitem(last = False)
+		else:
+			self.hits += 1
+			self.tiles.move_to_end(key)
+		return tile
+	def build(self, tx, ty):
+		field = self.field
+		size = self.tile_size
+		x0 = tx*size
+		y0 = ty*size
+		still = ~field.moving[:field.n]
+		positions = field.positions[:field.n][still]
+		gm = field.g*field.masses[:field.n][still]
+		# distance from every body's center to the tile
+		dx = np.maximum(np.maximum(x0 - positions[:, 0], positions[:, 0] - (x0 + size)), 0)
+		dy = np.maximum(np.maximum(y0 - positions[:, 1], positions[:, 1] - (y0 + size)), 0)
+		near = np.hypot(dx, dy) <= field.radii[:field.n][still] + self.exact_distance
+		near_bodies = [(float(x), float(y), float(m)) for (x, y), m in zip(positions[near], gm[near])]
+		k = self.resolution + 1
+		xs = x0 + np.arange(k)*self.spacing
+		ys = y0 + np.arange(k)*self.spacing
+		nodes = np.stack(np.meshgrid(xs, ys, indexing = "ij"), axis = -1).reshape(-1, 2)
+		acc = np.zeros_like(nodes)
+		far = ~near
+		if far.any():
+			d = positions[far][None, :, :] - nodes[:, None, :]
+			r2 = np.einsum("ijk,ijk->ij", d, d)
+			acc = np.einsum("ij,ijk->ik", gm[far]/(r2*np.sqrt(r2)), d)
+		# nested lists: indexing them is much cheaper than indexing an array one float at a time
+		return x0, y0, acc.reshape(k, k, 2).tolist(), near_bodies
+	def calc_force(self, other_pos, mass):
+		x = other_pos[0]
+		y = other_pos[1]
+		x0, y0, grid, near = self.tile(int(floor(x/self.tile_size)), int(floor(y/self.tile_size)))
+		u = (x - x0)/self.spacing
+		v = (y - y0)/self.spacing
+		i = min(int(u), self.resolution - 1)
+		j = min(int(v), self.resolution - 1)
+		u -= i
+		v -= j
+		a = grid[i][j]
+		b = grid[i + 1][j]
+		c = grid[i][j + 1]
+		d = grid[i + 1][j + 1]
+		ax = (a[0]*(1 - u) + b[0]*u)*(1 - v) + (c[0]*(1 - u) + d[0]*u)*v
+		ay = (a[1]*(1 - u) + b[1]*u)*(1 - v) + (c[1]*(1 - u) + d[1]*u)*v
+		for bx, by, gm in near:
+			dx = bx - x
+			dy = by - y
+			r2 = dx*dx + dy*dy
+			f = gm/(r2*sqrt(r2))
+			ax += f*dx
+			ay += f*dy
+		if self.movers is not None:
+			d = self.field.positions[self.movers] - (x, y)
+			r2 = np.einsum("ij,ij->i", d, d)
+			fx, fy = np.dot(self.mover_gm/(r2*np.sqrt(r2)), d)
+			ax += float(fx)
+			ay += float(fy)
+		return Vector2(ax*mass, ay*mass)
@@ -0,0 +1,222 @@
+# coding: utf-8
+# pure python stand-in for the parts of pythonista's scene module that the game uses.
+# the drawing functions do nothing, so the game logic can run on any machine.
+#
+# use install() before importing the game modules:
+#
+#	import headless
+#	headless.install()
+#	from vehicles import *
+#
+# install() only takes effect when the real scene module can't be imported.
+from math import sqrt
+import sys
+
+__all__ = ["Vector2", "Point", "Vector3", "Size", "Rect", "Scene", "run",
+	"background", "fill", "no_fill", "stroke", "no_stroke", "stroke_weight", "tint", "no_tint",
+	"ellipse", "rect", "line", "triangle_strip", "image", "image_quad", "text",
+	"push_matrix", "pop_matrix", "translate", "scale", "rotate", "blend_mode"]
+
+class Vector2 (object):
+	__slots__ = ("x", "y")
+	def __init__(self, x = 0.0, y = 0.0):
+		self.x = x
+		self.y = y
+	def __repr__(self):
+		return "%s(%r, %r)" % (self.__class__.__name__, self.x, self.y)
+	def __len__(self):
+		return 2
+	def __getitem__(self, i):
+		if i == 0 or i == -2:
+			return self.x
+		if i == 1 or i == -1:
+			return self.y
+		raise IndexError("Vector2 index out of range")
+	def __iter__(self):
+		yield self.x
+		yield self.y
+	def __eq__(self, other):
+		if isinstance(other, Vector2):
+			return self.x == other.x and self.y == other.y
+		try:
+			return self.x == other[0] and self.y == other[1]
+		except (TypeError, IndexError):
+			return False
+	def __ne__(self, other):
+		return not self == other
+	def __hash__(self):
+		return hash((self.x, self.y))
+	def __add__(self, other):
+		if isinstance(other, Vector2):
+			return self.__class__(self.x + other.x, self.y + other.y)
+		return self.__class__(self.x + other[0], self.y + other[1])
+	__radd__ = __add__
+	def __sub__(self, other):
+		if isinstance(other, Vector2):
+			return self.__class__(self.x - other.x, self.y - other.y)
+		return self.__class__(self.x - other[0], self.y - other[1])
+	def __rsub__(self, other):
+		return self.__class__(other[0] - self.x, other[1] - self.y)
+	def __mul__(self, other):
+		if isinstance(other, Vector2):
+			return self.__class__(self.x*other.x, self.y*other.y)
+		if hasattr(other, "__len__"):
+			return self.__class__(self.x*other[0], self.y*other[1])
+		return self.__class__(self.x*other, self.y*other)
+	__rmul__ = __mul__
+	def __truediv__(self, other):
+		if isinstance(other, Vector2):
+			return self.__class__(self.x/other.x, self.y/other.y)
+		if hasattr(other, "__len__"):
+			return self.__class__(self.x/other[0], self.y/other[1])
+		return self.__class__(self.x/other, self.y/other)
+	__div__ = __truediv__
+	def __neg__(self):
+		return self.__class__(-self.x, -self.y)
+	def __pos__(self):
+		return self
+	def __abs__(self):
+		return sqrt(self.x*self.x + self.y*self.y)
+
+class Point (Vector2):
+	__slots__ = ()
+
+class Size (Vector2):
+	__slots__ = ()
+	@property
+	def w(self):
+		return self.x
+	@w.setter
+	def w(self, value):
+		self.x = value
+	@property
+	def h(self):
+		return self.y
+	@h.setter
+	def h(self, value):
+		self.y = value
+
+class Vector3 (object):
+	__slots__ = ("x", "y", "z")
+	def __init__(self, x = 0.0, y = 0.0, z = 0.0):
+		self.x = x
+		self.y = y
+		self.z = z
+	def __repr__(self):
+		return "Vector3(%r, %r, %r)" % (self.x, self.y, self.z)
+	def __getitem__(self, i):
+		return (self.x, self.y, self.z)[i]
+	def __eq__(self, other):
+		return self.x == other[0] and self.y == other[1] and self.z == other[2]
+	def __hash__(self):
+		return hash((self.x, self.y, self.z))
+	def __add__(self, other):
+		return Vector3(self.x + other[0], self.y + other[1], self.z + other[2])
+	def __sub__(self, other):
+		return Vector3(self.x - other[0], self.y - other[1], self.z - other[2])
+	def __mul__(self, s):
+		return Vector3(self.x*s, self.y*s, self.z*s)
+	__rmul__ = __mul__
+	def __truediv__(self, s):
+		return Vector3(self.x/s, self.y/s, self.z/s)
+	__div__ = __truediv__
+	def __abs__(self):
+		return sqrt(self.x*self.x + self.y*self.y + self.z*self.z)
+
+class Rect (object):
+	__slots__ = ("x", "y", "w", "h")
+	def __init__(self, x = 0.0, y = 0.0, w = 0.0, h = 0.0):
+		self.x = x
+		self.y = y
+		self.w = w
+		self.h = h
+	def __repr__(self):
+		return "Rect(%r, %r, %r, %r)" % (self.x, self.y, self.w, self.h)
+	def __eq__(self, other):
+		return isinstance(other, Rect) and (self.x, self.y, self.w, self.h) == (other.x, other.y, other.w, other.h)
+	def __hash__(self):
+		return hash((self.x, self.y, self.w, self.h))
+	@property
+	def origin(self):
+		return Point(self.x, self.y)
+	@property
+	def size(self):
+		return Size(self.w, self.h)
+	@property
+	def min_x(self):
+		return min(self.x, self.x + self.w)
+	@property
+	def max_x(self):
+		return max(self.x, self.x + self.w)
+	@property
+	def min_y(self):
+		return min(self.y, self.y + self.h)
+	@property
+	def max_y(self):
+		return max(self.y, self.y + self.h)
+	def center(self, p = None):
+		# like scene.Rect.center: returns the center without an argument, moves the rect with one
+		if p == None:
+			return Point(self.x + self.w/2.0, self.y + self.h/2.0)
+		self.x = p[0] - self.w/2.0
+		self.y = p[1] - self.h/2.0
+	def inset(self, top, left, bottom = None, right = None):
+		if bottom == None:
+			bottom = top
+		if right == None:
+			right = left
+		return Rect(self.x + left, self.y + bottom, self.w - left - right, self.h - top - bottom)
+	def translate(self, x, y):
+		return Rect(self.x + x, self.y + y, self.w, self.h)
+	def contains_point(self, p):
+		return self.min_x <= p[0] < self.max_x and self.min_y <= p[1] < self.max_y
+	def __contains__(self, p):
+		return self.contains_point(p)
+	def contains_rect(self, r):
+		return self.min_x <= r.min_x and r.max_x <= self.max_x and self.min_y <= r.min_y and r.max_y <= self.max_y
+	def intersects(self, r):
+		return self.min_x < r.max_x and r.min_x < self.max_x and self.min_y < r.max_y and r.min_y < self.max_y
+	def intersection(self, r):
+		x = max(self.min_x, r.min_x)
+		y = max(self.min_y, r.min_y)
+		w = min(self.max_x, r.max_x) - x
+		h = min(self.max_y, r.max_y) - y
+		if w < 0 or h < 0:
+			return Rect(0, 0, 0, 0)
+		return Rect(x, y, w, h)
+	def union(self, r):
+		x = min(self.min_x, r.min_x)
+		y = min(self.min_y, r.min_y)
+		return Rect(x, y, max(self.max_x, r.max_x) - x, max(self.max_y, r.max_y) - y)
+
+class Scene (object):
+	def __init__(self):
+		self.size = Size(1024, 768)
+		self.bounds = Rect(0, 0, 1024, 768)
+		self.dt = 1/60.0
+		self.t = 0.0
+		self.touches = {}
+	def setup(self):
+		pass
+	def update(self):
+		pass
+	def draw(self):
+		pass
+
+def run(scene, *args, **kwargs):
+	# there is no screen to present the scene on, so only set it up
+	scene.setup()
+
+def _noop(*args, **kwargs):
+	pass
+
+background = fill = no_fill = stroke = no_stroke = stroke_weight = tint = no_tint = _noop
+ellipse = rect = line = triangle_strip = image = image_quad = text = _noop
+push_matrix = pop_matrix = translate = scale = rotate = blend_mode = _noop
+
+def install():
+	try:
+		import scene
+	except ImportError:
+		sys.modules["scene"] = sys.modules[__name__]
+		sys.modules["scene_drawing"] = sys.modules[__name__]
@@ -1,39 +1,153 @@
-from scene import *
-from ui import Path
-
-image = "graphics/spaceship.png"
-
-class Analysis (Scene):
-	def setup(self):
-		self.image = SpriteNode(Texture(image), z_position = -12, position = self.bounds.center(), parent = self)
-		self.background = ShapeNode(path = Path.rect(0,0,self.image.size.w,self.image.size.h), position = self.image.position, z_position = -15, parent = self, fill_color = (1,1,1,.1))
-		self.offset = Point(-50, 50)
-		self.cursor = Node(parent = self)
-		ShapeNode(path = Path.rect(0,0,1,20), parent = self.cursor, fill_color = (0,0,0))
-		ShapeNode(path = Path.rect(0,0,20,1), parent = self.cursor, fill_color = (0,0,0))
-		self.cursorlabel = LabelNode("", parent = self, position = (self.bounds.w/2.0, self.bounds.h*.9))
-		self.selected = []
-		self.selected_nodes = []
-		self.selectbutton = ShapeNode(Path.rect(0,0,150,50), parent = self, position = (self.bounds.w*.2, self.bounds.h*.9), fill_color = (0,0,0), stroke_color = (1,1,1))
-		LabelNode("Select", parent = self.selectbutton)
-		
-		self.printbutton = ShapeNode(Path.rect(0,0,150,50), parent = self, position = (self.bounds.w*.8, self.bounds.h*.9), fill_color = (0,0,0), stroke_color = (1,1,1))
-		LabelNode("Print", parent = self.printbutton)
-	def give_position(self, pos):
-		pt = (self.image.point_from_scene(pos) + self.image.size/2.0)
-		pt = Point(pt.x/self.image.size.w, pt.y/self.image.size.h)
-		return pt
-	def update_position(self, pos):
-		self.cursorlabel.text = str(self.give_position(pos))
-	def update(self):
-		for touch in self.touches.values():
-				if touch.location not in self.selectbutton.bbox and touch.location not in self.printbutton.bbox:
-					self.cursor.position = touch.location + self.offset
-					self.update_position(self.cursor.position)
-	def touch_began(self, touch):
-		if touch.location in self.selectbutton.bbox:
-			self.selected.append(self.give_position(self.cursor.position))
-			self.selected_nodes.append(ShapeNode(path = Path.oval(0,0,5,5), parent = self, position = self.cursor.position, z_position = -10, fill_color = (1,1,1), stroke_color = (0,0,0)))
-		if touch.location in self.printbutton.bbox:
-			print self.selected
-run(Analysis())
+# coding: utf-8
+# collision hulls from sprite alpha, without a screen: the alpha channel is thresholded, the outline of the opaque
+# pixels taken, its convex hull resampled to a point budget, and the centroid and moment of inertia of the opaque
+# area measured. results go to graphics/hulls.json keyed by the sha1 of the image, so ships look their hull up at
+# startup and a new sprite is analysed the first time it's used. to (re)build the cache for some sprites:
+#
+#	python imageanalysis.py graphics/spaceship.png [budget]
+#
+# hull points and the centroid are in fractions of the sprite, (0, 0) its bottom left corner and (1, 1) its top right,
+# like ShipShape wants them. inertia is per unit mass, about the centroid, in the same units.
+import hashlib
+import json
+import os
+import sys
+from math import atan2
+import numpy as np
+from PIL import Image
+
+root = os.path.dirname(os.path.abspath(__file__))
+cache_path = os.path.join(root, "graphics", "hulls.json")
+version = 2 # part of the cache key, bump it when the analysis changes
+
+def image_hash(path):
+	with open(path, "rb") as f:
+		return hashlib.sha1(f.read()).hexdigest()
+
+def alpha_mask(path, threshold = 128):
+	# opaque pixels as a bool array, row 0 at the bottom so y points up like in the game
+	alpha = np.asarray(Image.open(path).convert("RGBA"))[:, :, 3]
+	return alpha[::-1] >= threshold
+
+def contour(mask):
+	# (x, y) of the opaque pixels next to a transparent one or the border
+	padded = np.pad(mask, 1)
+	inner = padded[:-2, 1:-1] & padded[2:, 1:-1] & padded[1:-1, :-2] & padded[1:-1, 2:]
+	ys, xs = np.nonzero(mask & ~inner)
+	return np.stack((xs, ys), axis = -1)
+
+def cross(o, a, b):
+	return (a[0] - o[0])*(b[1] - o[1]) - (a[1] - o[1])*(b[0] - o[0])
+
+def convex_hull(points):
+	# andrew's monotone chain: counterclockwise, without collinear points
+	points = sorted(set(map(tuple, points)))
+	if len(points) < 3:
+		return points
+	lower = []
+	for p in points:
+		while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+			lower.pop()
+		lower.append(p)
+	upper = []
+	for p in reversed(points):
+		while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+			upper.pop()
+		upper.append(p)
+	return lower[:-1] + upper[:-1]
+
+def resample(polygon, budget, corner_angle = .5):
+	# budget points on the outline of the closed polygon, for collision tests that only look at points:
+	# its corners first, where the outline turns by more than corner_angle radians within a short stretch (at most
+	# half the budget, never two close together), then the rest spread out so the gaps along the outline stay as
+	# even as they can. in order along the outline
+	vertices = np.array(list(polygon) + [polygon[0]], dtype = float)
+	lengths = np.hypot(*np.diff(vertices, axis = 0).T)
+	starts = np.concatenate(([0.0], np.cumsum(lengths)))
+	perimeter = starts[-1]
+	spacing = perimeter/budget
+	def at(d):
+		d %= perimeter
+		i = min(int(np.searchsorted(starts, d, side = "right")) - 1, len(lengths) - 1)
+		return vertices[i] + (vertices[i + 1] - vertices[i])*((d - starts[i])/lengths[i])
+	# how sharply the outline turns around each vertex, over a quarter of the spacing to either side,
+	# so a corner that the pixel grid split into two vertices still counts as one
+	turns = []
+	for i in range(len(lengths)):
+		before = vertices[i] - at(starts[i] - spacing/4.0)
+		after = at(starts[i] + spacing/4.0) - vertices[i]
+		turns.append((atan2(cross((0, 0), before, after), before.dot(after)), starts[i]))
+	chosen = []
+	for turn, d in sorted(turns, reverse = True):
+		if turn < corner_angle or len(chosen) >= budget//2:
+			break
+		if all(min(abs(d - c), perimeter - abs(d - c)) >= spacing/2.0 for c in chosen):
+			chosen.append(d)
+	if not chosen:
+		chosen.append(0.0)
+	chosen.sort()
+	gaps = [(chosen[(j + 1) % len(chosen)] - chosen[j]) % perimeter or perimeter for j in range(len(chosen))]
+	extra = [0]*len(chosen)
+	for k in range(budget - len(chosen)):
+		j = max(range(len(gaps)), key = lambda j: gaps[j]/(extra[j] + 1))
+		extra[j] += 1
+	points = []
+	for d, gap, n in zip(chosen, gaps, extra):
+		for k in range(n + 1):
+			x, y = at(d + gap*k/(n + 1))
+			points.append((float(x), float(y)))
+	return points
+
+def hull(mask, budget = 11):
+	# convex hull around the outline pixels' corners, so it holds every opaque pixel whole
+	edge = contour(mask)
+	corners = np.concatenate([edge + offset for offset in ((0, 0), (1, 0), (0, 1), (1, 1))])
+	return resample(convex_hull(corners.tolist()), budget)
+
+def mass_properties(mask):
+	# area, centroid and moment of inertia per unit mass of the opaque pixels, in pixels
+	ys, xs = np.nonzero(mask)
+	xs = xs + .5
+	ys = ys + .5
+	cx = xs.mean()
+	cy = ys.mean()
+	# every pixel is a unit square: 1/12 + 1/12 on top of its center's share
+	inertia = ((xs - cx)**2 + (ys - cy)**2).mean() + 1/6.0
+	return len(xs), (float(cx), float(cy)), float(inertia)
+
+def analyse(path, budget = 11, threshold = 128):
+	mask = alpha_mask(path, threshold)
+	if not mask.any():
+		raise ValueError("%s has no pixels with alpha >= %d" % (path, threshold))
+	h, w = mask.shape
+	area, (cx, cy), inertia = mass_properties(mask)
+	return dict(
+		size = [w, h],
+		hull = [[round(x/float(w), 4), round(y/float(h), 4)] for x, y in hull(mask, budget)],
+		centroid = [round(cx/w, 4), round(cy/h, 4)],
+		inertia = round(inertia/(w*h), 6),
+		area = round(area/float(w*h), 4))
+
+def load(path, budget = 11, threshold = 128, cache = cache_path):
+	# the analysis of the sprite at path (relative to the game's folder), from the cache if it has it
+	path = os.path.join(root, path)
+	key = "%s:%d:%d:%d" % (image_hash(path), budget, threshold, version)
+	entries = {}
+	if os.path.exists(cache):
+		with open(cache) as f:
+			entries = json.load(f)
+	if key not in entries:
+		entries[key] = analyse(path, budget, threshold)
+		entries[key]["image"] = os.path.relpath(path, root)
+		try:
+			with open(cache, "w") as f:
+				json.dump(entries, f, indent = 1, sort_keys = True)
+		except IOError:
+			# a read only install still works, it just analyses again next time
+			pass
+	return entries[key]
+
+if __name__ == "__main__":
+	budget = int(sys.argv[2]) if len(sys.argv) > 2 else 11
+	result = load(sys.argv[1], budget)
+	print("%d hull points, centroid %s, inertia %s" % (len(result["hull"]), result["centroid"], result["inertia"]))
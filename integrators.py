@@ -0,0 +1,99 @@
+# coding: utf-8
+# integrators advance a Movement by dt reference ticks.
+# they get the forces from the body they integrate, which must have:
+#
+#	thrust(angle) -> Vector2, the acceleration from the engines when pointing at angle
+#	gravity(position) -> Vector2, the acceleration from gravity at position
+#
+# the base class steps with semi-implicit euler, the others replace linear.
+# the angular state is the same for every integrator: the angular acceleration is the player's input
+# and friction is a clamped constant deceleration, so a semi-implicit step is already exact enough.
+from math import ceil
+
+angular_friction = .005
+
+class Integrator (object):
+	def step(self, body, m, dt = 1.0):
+		p_a, v_a, a_a = self.angular(m.a_position, m.a_velocity, m.a_acceleration, dt)
+		pos, vel, acc = self.linear(body, m.position, m.velocity, p_a, dt)
+		return m.__class__(pos, vel, acc, p_a, v_a, a_a)
+	def angular(self, p_a, v_a, a_a, dt):
+		v_a += a_a*dt
+		if a_a == 0 and v_a != 0:
+			friction = angular_friction*dt
+			sign = abs(v_a)/v_a
+			v_a += -sign*min(abs(v_a), friction)
+		if abs(v_a) < .0001:
+			v_a = 0
+		p_a += v_a*dt
+		return p_a, v_a, a_a
+	def linear(self, body, pos, vel, angle, dt):
+		# symplectic euler: velocity first, then position with the new velocity. subclasses replace it
+		acc = body.thrust(angle) + body.gravity(pos)
+		vel += acc*dt
+		pos += vel*dt
+		return pos, vel, acc
+
+class ExplicitEuler (Integrator):
+	# position moves with the old velocity. gains energy in orbits; only here for comparison
+	def linear(self, body, pos, vel, angle, dt):
+		acc = body.thrust(angle) + body.gravity(pos)
+		return pos + vel*dt, vel + acc*dt, acc
+
+class SemiImplicitEuler (Integrator):
+	# the base step under its own name. what the game has always used
+	pass
+
+class VelocityVerlet (Integrator):
+	# second order and symplectic. gravity at the end of a step is kept for the start of the next,
+	# so it costs one gravity evaluation per step unless something (like a collision) moved the body in between
+	def __init__(self):
+		self.last_position = None
+		self.last_gravity = None
+	def linear(self, body, pos, vel, angle, dt):
+		thrust = body.thrust(angle)
+		if self.last_position != None and self.last_position == pos:
+			gravity = self.last_gravity
+		else:
+			gravity = body.gravity(pos)
+		acc = thrust + gravity
+		pos = pos + vel*dt + acc*(dt*dt/2.0)
+		new_gravity = body.gravity(pos)
+		vel = vel + (acc + thrust + new_gravity)*(dt/2.0)
+		self.last_position = pos
+		self.last_gravity = new_gravity
+		return pos, vel, thrust + new_gravity
+
+class AdaptiveRK4 (Integrator):
+	# classic runge-kutta, split into substeps near massive bodies.
+	# the substep is kept below accuracy times the local free fall time,
+	# which is large everywhere except close to something heavy, so most steps take one substep
+	def __init__(self, accuracy = .05, max_substeps = 64):
+		self.accuracy = accuracy
+		self.max_substeps = max_substeps
+		self.substeps = 0 # substeps used by the last step
+	def substeps_for(self, body, pos, dt):
+		timescale = body.gravity_timescale(pos)
+		if timescale == None or timescale <= 0:
+			return 1
+		return int(min(max(ceil(dt/(self.accuracy*timescale)), 1), self.max_substeps))
+	def linear(self, body, pos, vel, angle, dt):
+		thrust = body.thrust(angle)
+		n = self.substeps_for(body, pos, dt)
+		self.substeps = n
+		h = dt/float(n)
+		acc = thrust
+		for i in range(n):
+			a1 = thrust + body.gravity(pos)
+			v2 = vel + a1*(h/2.0)
+			a2 = thrust + body.gravity(pos + vel*(h/2.0))
+			v3 = vel + a2*(h/2.0)
+			a3 = thrust + body.gravity(pos + v2*(h/2.0))
+			v4 = vel + a3*h
+			a4 = thrust + body.gravity(pos + v3*h)
+			pos = pos + (vel + v2*2 + v3*2 + v4)*(h/6.0)
+			acc = (a1 + a2*2 + a3*2 + a4)/6.0
+			vel = vel + acc*h
+		return pos, vel, acc
+
+integrators = {"explicit euler": ExplicitEuler, "semi-implicit euler": SemiImplicitEuler, "verlet": VelocityVerlet, "rk4": AdaptiveRK4}
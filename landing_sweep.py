@@ -0,0 +1,135 @@
+# coding: utf-8
+# batch runner for tuning the landing parameters: runs many headless flights, one per parameter set,
+# across a process pool and writes what happened in each to a columnar results file.
+# every case carries its own seeds, so a sweep gives the same results however it's split over processes.
+import csv
+import json
+import random
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+
+from simulation import *
+
+parameters = ("thrust_force", "rotate_force", "bouncespeed", "planet_land_delay", "valid_landing_angle")
+columns = ("case", "seed") + parameters + ("landed", "upright", "time_to_land", "impact_speed", "fuel_used", "ticks")
+
+def defaults():
+	# the values a new Ship starts with
+	ship = Ship(HeadlessGame(), 0, 0)
+	return dict((name, getattr(ship, name)) for name in parameters)
+
+def grid(**values):
+	# every combination of the given values, e.g. grid(thrust_force = (.05, .1), bouncespeed = (.4, .6, .8));
+	# parameters that aren't given keep their defaults
+	names = [name for name in parameters if name in values]
+	base = defaults()
+	cases = []
+	for combination in product(*[values[name] for name in names]):
+		case = dict(base)
+		case.update(zip(names, combination))
+		cases.append(case)
+	return cases
+
+def sample(n, seed = 0, **ranges):
+	# n cases with each given parameter drawn uniformly from its (min, max) range
+	rng = random.Random(seed)
+	base = defaults()
+	names = [name for name in parameters if name in ranges]
+	cases = []
+	for i in range(n):
+		case = dict(base)
+		for name in names:
+			low, high = ranges[name]
+			case[name] = rng.uniform(low, high)
+		cases.append(case)
+	return cases
+
+def scripted_inputs(rng, ticks, presses = 12):
+	# random button presses spread over the flight
+	events = []
+	t = 0
+	for i in range(presses):
+		t += rng.randint(5, max(5, ticks//presses))
+		control = rng.choice(controls)
+		events.append((t, control, True))
+		events.append((t + rng.randint(3, 40), control, False))
+	return events
+
+def grid_layout(seed):
+	return planet_grid(random.Random(seed))
+
+def fly(case, seed, layout = grid_layout, ticks = 1500, inputs = None, stop_on_landing = True):
+	# one flight with the parameters in case; returns a row of results.
+	# seed picks the layout, the start position and (if inputs isn't given) the scripted inputs
+	rng = random.Random(seed)
+	if inputs == None:
+		inputs = scripted_inputs(rng, ticks)
+	game = HeadlessGame(layout(seed), InputScript(inputs), x = rng.uniform(-300, 300), y = rng.uniform(600, 1100))
+	ship = game.vehicle
+	for name in parameters:
+		setattr(ship, name, case[name])
+	dt = game.tick_dt
+	landed = False
+	upright = False
+	time_to_land = None
+	impact_speed = None
+	fuel_used = 0.0
+	touching = False
+	for tick in range(ticks):
+		speed = ship.speed
+		game.step(1)
+		if ship.accelerating:
+			fuel_used += ship.thrust_force*dt
+		if ship.collisions and not touching and impact_speed == None:
+			# speed just before the first touchdown
+			impact_speed = speed
+		touching = len(ship.collisions) > 0
+		if game.landings and not landed:
+			landed = True
+			time_to_land = game.ticks
+			upright = ship.planet_landed.valid_landing(ship.position, ship.up, ship.valid_landing_angle)
+			if stop_on_landing:
+				break
+	row = dict(case)
+	row.update(seed = seed, landed = landed, upright = upright, time_to_land = time_to_land, impact_speed = impact_speed, fuel_used = fuel_used, ticks = game.ticks)
+	return row
+
+def _fly(job):
+	# unpacks a job for the process pool; module level so it can be pickled
+	i, case, seed, kwargs = job
+	row = fly(case, seed, **kwargs)
+	row["case"] = i
+	return row
+
+def run(cases, seeds = (0,), workers = None, chunksize = 4, **kwargs):
+	# flies every case once per seed across a pool of worker processes (one per core by default).
+	# kwargs go to fly; a custom layout has to be a module level function so it can be sent to the workers.
+	# returns the rows in case and seed order
+	jobs = [(i, case, seed, kwargs) for i, case in enumerate(cases) for seed in seeds]
+	if workers == 1:
+		return [_fly(job) for job in jobs]
+	with ProcessPoolExecutor(max_workers = workers) as executor:
+		return list(executor.map(_fly, jobs, chunksize = chunksize))
+
+def to_columns(rows):
+	return dict((name, [row[name] for row in rows]) for name in columns)
+
+def write(rows, path):
+	# .json files get one list per column, anything else is written as csv with a header
+	if path.endswith(".json"):
+		with open(path, "w") as f:
+			json.dump(to_columns(rows), f)
+	else:
+		with open(path, "w") as f:
+			writer = csv.writer(f)
+			writer.writerow(columns)
+			for row in rows:
+				writer.writerow(["" if row[name] == None else row[name] for name in columns])
+
+if __name__ == "__main__":
+	import sys
+	path = sys.argv[1] if len(sys.argv) > 1 else "landing_sweep.csv"
+	cases = grid(thrust_force = (.05, .1, .2), bouncespeed = (.4, .6, .8), planet_land_delay = (5, 10, 20))
+	rows = run(cases, seeds = range(4))
+	write(rows, path)
+	print("%d flights, %d landed, written to %s" % (len(rows), sum(row["landed"] for row in rows), path))
@@ -0,0 +1,103 @@
+# coding: utf-8
+# two-body (kepler) orbit math on plain floats.
+# positions and velocities are relative to the central body, mu is the gravitational parameter:
+# for the ship that's g*ship.mass*body.mass, since the game applies calc_force directly as acceleration.
+from math import sqrt, sin, cos, sinh, cosh, log, atan2, pi, acos, acosh, copysign
+
+def stumpff(z):
+	# stumpff functions C(z) and S(z) of the universal variable formulation
+	if z > 1e-6:
+		s = sqrt(z)
+		return (1 - cos(s))/z, (s - sin(s))/(s*s*s)
+	if z < -1e-6:
+		s = sqrt(-z)
+		return (cosh(s) - 1)/(-z), (sinh(s) - s)/(s*s*s)
+	return 1/2.0 - z/24.0, 1/6.0 - z/120.0
+
+def semi_major_axis(rx, ry, vx, vy, mu):
+	# negative for hyperbolic orbits, infinite for parabolic ones
+	alpha = 2.0/sqrt(rx*rx + ry*ry) - (vx*vx + vy*vy)/mu
+	if alpha == 0:
+		return float("inf")
+	return 1.0/alpha
+
+def eccentricity(rx, ry, vx, vy, mu):
+	r = sqrt(rx*rx + ry*ry)
+	rv = rx*vx + ry*vy
+	k = (vx*vx + vy*vy) - mu/r
+	ex = (k*rx - rv*vx)/mu
+	ey = (k*ry - rv*vy)/mu
+	return ex, ey
+
+def propagate(rx, ry, vx, vy, mu, t, tolerance = 1e-9, max_iterations = 60):
+	# state after t ticks on the conic through (r, v). returns (rx, ry, vx, vy)
+	r0 = sqrt(rx*rx + ry*ry)
+	v2 = vx*vx + vy*vy
+	rv = rx*vx + ry*vy
+	alpha = 2.0/r0 - v2/mu
+	smu = sqrt(mu)
+	if alpha > 1e-12:
+		# ellipse: whole periods change nothing
+		period = 2*pi/sqrt(mu*alpha**3)
+		t = t % period
+		chi = smu*t*alpha
+	elif alpha < -1e-12:
+		a = 1.0/alpha
+		s = copysign(1.0, t) if t != 0 else 1.0
+		arg = (-2*mu*alpha*t)/(rv + s*sqrt(-mu*a)*(1 - r0*alpha))
+		chi = s*sqrt(-a)*log(arg) if arg > 0 else smu*t/r0
+	else:
+		chi = smu*t/r0
+	for i in range(max_iterations):
+		z = alpha*chi*chi
+		c, s = stumpff(z)
+		chi2 = chi*chi
+		f = rv/smu*chi2*c + (1 - alpha*r0)*chi2*chi*s + r0*chi - smu*t
+		r = rv/smu*chi*(1 - z*s) + (1 - alpha*r0)*chi2*c + r0
+		delta = f/r
+		chi -= delta
+		if abs(delta) <= tolerance*max(1.0, abs(chi)):
+			break
+	z = alpha*chi*chi
+	c, s = stumpff(z)
+	chi2 = chi*chi
+	lf = 1 - chi2/r0*c
+	lg = t - chi2*chi/smu*s
+	nx = lf*rx + lg*vx
+	ny = lf*ry + lg*vy
+	r = sqrt(nx*nx + ny*ny)
+	lfdot = smu/(r*r0)*(z*s - 1)*chi
+	lgdot = 1 - chi2/r*c
+	return nx, ny, lfdot*rx + lgdot*vx, lfdot*ry + lgdot*vy
+
+def periapsis(rx, ry, vx, vy, mu):
+	# (distance, ticks until the next periapsis passage) of the orbit through (r, v).
+	# the time is None when the body is moving away on an open orbit and never gets closer again
+	r = sqrt(rx*rx + ry*ry)
+	rv = rx*vx + ry*vy
+	ex, ey = eccentricity(rx, ry, vx, vy, mu)
+	e = sqrt(ex*ex + ey*ey)
+	h = rx*vy - ry*vx
+	distance = (h*h/mu)/(1 + e)
+	if e < 1e-9:
+		# circular: every point is the periapsis
+		return distance, 0.0
+	alpha = 2.0/r - (vx*vx + vy*vy)/mu
+	if alpha > 1e-12:
+		a = 1.0/alpha
+		big_e = acos(max(-1.0, min(1.0, (1 - r/a)/e)))
+		if rv < 0:
+			big_e = 2*pi - big_e
+		mean = big_e - e*sin(big_e)
+		return distance, (2*pi - mean)/sqrt(mu*alpha**3)
+	if rv >= 0:
+		return distance, None
+	if alpha < -1e-12:
+		a = -1.0/alpha
+		big_h = acosh(max(1.0, (1 + r/a)/e))
+		mean = e*sinh(big_h) - big_h
+		return distance, mean/sqrt(mu/a**3)
+	# parabola, by barker's equation
+	p = h*h/mu
+	d = -sqrt(max(r/(p/2.0) - 1, 0.0))
+	return distance, -sqrt(p*p*p/mu)/2.0*(d + d*d*d/3.0)
@@ -0,0 +1,86 @@
+# coding: utf-8
+# thruster flames as a fixed size ring buffer of particles in numpy arrays.
+# every particle lives the same number of frames, so they die in the order they were emitted
+# and new ones simply overwrite the oldest slots. nothing is allocated per particle.
+# they're drawn as one strip textured with ramp, a gray ramp: all corners of a particle sit on the texel of its
+# brightness and the tint turns the gray into the flame's color, so particles of every age go in one call
+import numpy as np
+from scene import *
+
+from batched_drawing import *
+from render import *
+
+__all__ = ["ParticlePool"]
+
+ramp = "graphics/ramp.png" # 256 x 1, gray level x at x
+
+class ParticlePool (object):
+	def __init__(self, capacity = 1024, seed = None, color = (1.0, .32, .08), radius = 15, shrink = .5, decay = .95, speed = 4, speed_spread = 2):
+		self.capacity = capacity
+		self.x = np.zeros(capacity)
+		self.y = np.zeros(capacity)
+		self.dx = np.zeros(capacity)
+		self.dy = np.zeros(capacity)
+		self.speed = np.zeros(capacity)
+		self.age = np.zeros(capacity, dtype = int)
+		self.head = 0 # slot the next particle goes in
+		self.count = 0 # live particles, the count slots before head
+		self.rng = np.random.RandomState(seed)
+		self.color = color
+		self.radius = radius
+		self.shrink = shrink
+		self.decay = decay
+		self.min_speed = speed
+		self.speed_spread = speed_spread
+		# a particle is gone once its radius is used up
+		self.lifetime = int(np.ceil(radius/float(shrink)))
+		ages = np.arange(self.lifetime + 1)
+		self.radii = np.maximum(radius - shrink*ages, 0.0) # by age
+		self.brightness = decay**ages # by age
+		self.segments = 10
+		# the strip and its texture coordinates are built in these; what's drawn points into them until the next draw
+		self.points = np.zeros((capacity*(self.segments + 2), 2))
+		self.tex_coords = np.full((capacity*(self.segments + 2), 2), .5)
+	def slots(self, n):
+		# indices of the n slots starting at head, wrapping around
+		return (self.head + np.arange(n)) % self.capacity
+	def emit(self, xs, ys, dxs, dys):
+		# new particles at (xs[i], ys[i]) moving along the unit vectors (dxs[i], dys[i])
+		n = len(xs)
+		if n == 0:
+			return
+		if n > self.capacity:
+			xs, ys, dxs, dys = xs[-self.capacity:], ys[-self.capacity:], dxs[-self.capacity:], dys[-self.capacity:]
+			n = self.capacity
+		i = self.slots(n)
+		self.x[i] = xs
+		self.y[i] = ys
+		self.dx[i] = dxs
+		self.dy[i] = dys
+		self.speed[i] = self.min_speed + self.rng.random_sample(n)*self.speed_spread
+		self.age[i] = 0
+		self.head = (self.head + n) % self.capacity
+		self.count = min(self.count + n, self.capacity)
+	def live(self):
+		return (self.head - self.count + np.arange(self.count)) % self.capacity
+	def update(self):
+		# move and age every live particle, then forget the ones that burned out
+		i = self.live()
+		self.x[i] += self.dx[i]*self.speed[i]
+		self.y[i] += self.dy[i]*self.speed[i]
+		self.age[i] += 1
+		# the oldest particles come first, so the dead ones are a prefix
+		self.count -= int(np.count_nonzero(self.age[i] >= self.lifetime))
+	def draw(self):
+		if self.count == 0:
+			return
+		i = self.live()
+		ages = np.minimum(self.age[i], self.lifetime)
+		n = len(i)
+		k = self.segments + 2
+		points = disc_strip(self.x[i], self.y[i], self.radii[ages], self.segments, self.points)
+		self.tex_coords[:n*k].reshape(n, k, 2)[:, :, 0] = self.brightness[ages][:, None]
+		stroke_weight(0)
+		tint(*self.color)
+		triangle_strip(points, self.tex_coords[1:n*k - 1], ramp)
+		no_tint()
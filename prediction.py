@@ -0,0 +1,132 @@
+# coding: utf-8
+# predicted flight path of the ship for the debug overlay.
+# the ship's movement is integrated ahead with the ship's own integrator, as if the current inputs were held,
+# until horizon ticks or the first contact with a celestial. each point keeps the game time it's for, so the point
+# the ship should be at now is found from the time alone, and bodies on rails are moved to where they'll be at
+# that time while a point is integrated. every frame the ticks the ship has flown since are dropped from the front
+# and the same number is added at the tail, so a long prediction costs a few ticks per frame. it's computed from
+# scratch only when the inputs or the tick length change or the ship leaves the predicted path (a bounce, time warp).
+from collections import deque
+from copy import copy
+
+from scene import *
+
+from collision import first_contact
+from render import *
+
+__all__ = ["TrajectoryPredictor"]
+
+class TrajectoryPredictor (object):
+	def __init__(self, ship, horizon = 600, extend = 8, tolerance = .001):
+		self.ship = ship
+		self.horizon = horizon # ticks ahead
+		self.extend = extend # most ticks added per update once the prediction is in step
+		self.dt = None # the game's tick length when the prediction was made
+		self.tolerance = tolerance # how far the ship may be off the predicted point before starting over
+		self.points = deque() # (movement, body pulling hardest, distance to it, game time) per tick, from the ship on
+		self.impact = None # (position, celestial) where the prediction runs into something
+		self.inputs = None
+		self.integrator = None
+		self.recomputed = 0 # full recomputes, for the overlay
+		self.stepped = 0 # ticks integrated by the last update
+	def current_inputs(self):
+		ship = self.ship
+		return (ship.accelerating, ship.a_angle, ship.thrust_force, ship.integrator.__class__, ship.game.tick_dt)
+	def reset(self, m):
+		self.points = deque()
+		self.impact = None
+		self.inputs = self.current_inputs()
+		self.dt = self.ship.game.tick_dt
+		# a copy, so integrators that keep state between steps don't mix the prediction into the ship's flight
+		self.integrator = copy(self.ship.integrator)
+		self.points.append(self.sample(m, self.ship.game.time))
+		self.recomputed += 1
+	def sample(self, m, time):
+		body, perturbation = self.ship.game.gravity.dominant(m.position, self.ship.mass)
+		distance = abs(m.position - body.position) if body != None else None
+		return m, body, distance, time
+	def catch_up(self, m):
+		# how many ticks into the prediction the ship is now, None if it's not on it
+		i = int(round((self.ship.game.time - self.points[0][3])/self.dt))
+		if i < 0 or i >= len(self.points):
+			return None
+		d = self.points[i][0].position - m.position
+		if d.x*d.x + d.y*d.y > self.tolerance*self.tolerance:
+			return None
+		return i
+	def update(self):
+		m = self.ship.give_movement()
+		shift = None
+		if self.points and self.inputs == self.current_inputs():
+			shift = self.catch_up(m)
+		if shift == None:
+			self.reset(m)
+			budget = self.horizon
+		else:
+			for i in range(shift):
+				self.points.popleft()
+			budget = shift + self.extend
+		self.stepped = 0
+		rails = self.ship.game.rails
+		try:
+			while self.impact == None and len(self.points) <= self.horizon and self.stepped < budget:
+				self.advance()
+		finally:
+			if self.stepped and len(rails):
+				# back to where the bodies are now
+				rails.update(self.ship.game.time)
+	def advance(self):
+		# one more tick at the tail
+		ship = self.ship
+		m, body, distance, time = self.points[-1]
+		time += self.dt
+		rails = ship.game.rails
+		if len(rails):
+			# the world advances the time before it steps the ship, so the step sees the bodies at the new time
+			rails.update(time)
+		mu = self.integrator.step(ship, m, self.dt)
+		self.stepped += 1
+		reach = ship.bound_radius + abs(mu.position - m.position)
+		candidates = ship.game.spatial.query_circle(mu.position.x, mu.position.y, reach)
+		if candidates:
+			starts = ship.get_collision_array(m)
+			ends = ship.get_collision_array(mu)
+			for celestial in candidates:
+				contact = first_contact(starts, ends, (celestial.position.x, celestial.position.y), celestial.radius)
+				if contact != None:
+					self.impact = (Point(contact[2][0], contact[2][1]), celestial)
+					break
+		self.points.append(self.sample(mu, time))
+	def periapses(self):
+		# points where the distance to the body pulling hardest is smallest, while the same body keeps pulling hardest
+		found = []
+		before = middle = None
+		for after in self.points:
+			if before != None and middle[1] != None and before[1] is middle[1] and after[1] is middle[1]:
+				if middle[2] < before[2] and middle[2] <= after[2]:
+					found.append((middle[0].position, middle[1]))
+			before, middle = middle, after
+		return found
+	def draw(self, step = 4):
+		# the path as a line through every step-th tick, red where it ends on a celestial, periapses in blue
+		if len(self.points) < 2:
+			return
+		stroke_weight(1)
+		stroke(.3, .8, .3)
+		last = len(self.points) - 1
+		previous = None
+		for i, point in enumerate(self.points):
+			if i % step and i != last:
+				continue
+			p = point[0].position
+			if previous != None:
+				line(previous.x, previous.y, p.x, p.y)
+			previous = p
+		stroke_weight(0)
+		fill(.3, .5, 1)
+		for p, body in self.periapses():
+			ellipse(p.x - 4, p.y - 4, 8, 8)
+		if self.impact != None:
+			p = self.impact[0]
+			fill(1, 0, 0)
+			ellipse(p.x - 6, p.y - 6, 12, 12)
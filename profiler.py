@@ -0,0 +1,92 @@
+# coding: utf-8
+# opt in timing of the phases of a frame. start/stop pairs add the time between them to the phase's total for the
+# frame (a phase may run several times a frame, like gravity once per tick), count adds to a counter, and end_frame
+# moves the totals into fixed size ring buffers, so nothing is allocated per frame. the instrumented code does
+#
+#	p = self.game.profiler
+#	if p:
+#		p.start("gravity")
+#
+# so with the profiler set to None it costs an attribute lookup per phase. phases can nest; a phase's time
+# includes the phases inside it.
+import csv
+import json
+from collections import OrderedDict
+from time import perf_counter as clock
+import numpy as np
+
+from scene import *
+from render import *
+
+__all__ = ["Profiler"]
+
+class Profiler (object):
+	def __init__(self, size = 600):
+		self.size = size # frames kept
+		self.frames = 0 # frames ended so far
+		self.phases = OrderedDict() # name -> ring buffer of seconds per frame
+		self.counters = OrderedDict() # name -> ring buffer of counts per frame
+		self.totals = {} # this frame's seconds per phase
+		self.counts = {} # this frame's counts
+		self.started = {}
+	def start(self, name):
+		self.started[name] = clock()
+	def stop(self, name):
+		self.totals[name] = self.totals.get(name, 0.0) + clock() - self.started[name]
+	def count(self, name, n = 1):
+		self.counts[name] = self.counts.get(name, 0) + n
+	def end_frame(self):
+		# phases and counters that didn't come up this frame get 0, so percentiles are over frames
+		i = self.frames % self.size
+		for rings, values in ((self.phases, self.totals), (self.counters, self.counts)):
+			for name in values:
+				if name not in rings:
+					# nan for the frames before it first came up
+					rings[name] = np.full(self.size, np.nan)
+			for name, ring in rings.items():
+				ring[i] = values.get(name, 0)
+			values.clear()
+		self.frames += 1
+	def samples(self, name):
+		# the phase's seconds or the counter's values over the frames kept, oldest first
+		ring = self.phases[name] if name in self.phases else self.counters[name]
+		n = min(self.frames, self.size)
+		values = ring[(self.frames - n + np.arange(n)) % self.size]
+		return values[~np.isnan(values)]
+	def summary(self):
+		# name -> kind, frames, mean, p50, p95, p99 and max; in milliseconds for phases
+		result = OrderedDict()
+		for kind, rings, scale in (("phase", self.phases, 1000.0), ("counter", self.counters, 1.0)):
+			for name in rings:
+				values = self.samples(name)*scale
+				if len(values) == 0:
+					continue
+				p50, p95, p99 = np.percentile(values, (50, 95, 99))
+				result[name] = OrderedDict([("kind", kind), ("frames", len(values)), ("mean", float(values.mean())),
+					("p50", float(p50)), ("p95", float(p95)), ("p99", float(p99)), ("max", float(values.max()))])
+		return result
+	def write(self, path):
+		# the summary as csv, one row per phase or counter, or as json with every kept frame's values as well
+		summary = self.summary()
+		if path.endswith(".json"):
+			with open(path, "w") as f:
+				samples = dict((name, self.samples(name).tolist()) for name in summary)
+				json.dump(OrderedDict([("frames", self.frames), ("summary", summary), ("samples", samples)]), f, indent = 1)
+			return
+		with open(path, "w", newline = "") as f:
+			writer = csv.writer(f)
+			writer.writerow(["name", "kind", "frames", "mean", "p50", "p95", "p99", "max"])
+			for name, s in summary.items():
+				writer.writerow([name] + list(s.values()))
+	def draw(self, x, y, font_size = 12):
+		# the summary as lines of text going down from (x, y), left aligned
+		tint(1, 1, 1, .8)
+		text("%-14s %7s %7s %7s" % ("ms", "p50", "p95", "p99"), "Menlo", font_size, x, y, 6)
+		for name, s in self.summary().items():
+			y -= font_size*1.4
+			if s["kind"] == "phase":
+				line = "%-14s %7.2f %7.2f %7.2f" % (name, s["p50"], s["p95"], s["p99"])
+			else:
+				line = "%-14s %7d %7d %7d" % (name, s["p50"], s["p95"], s["p99"])
+			text(line, "Menlo", font_size, x, y, 6)
+		tint(1, 1, 1)
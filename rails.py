@@ -0,0 +1,174 @@
+# coding: utf-8
+# bodies on rails: celestials with a path move to where their path puts them at the game time.
+# all positions are evaluated at once, one numpy call per kind of path, and written into the gravity field
+# in one go, so the gravity and collision code see the moved bodies without any per body work of their own.
+# the spatial index holds every body as a circle margin bigger than the body, around where it was put in last,
+# so a body only has to be put in again once it's got further than margin from there.
+# a path's progress at time t is path.phase + t*path.speed, so where a body is only depends on the time:
+# a system that's streamed out and back in again shows up where it would have been.
+from itertools import repeat
+import numpy as np
+from scene import Point, Vector2
+
+from celestials import KeplerPath, SampledPath, eccentric_anomaly
+
+class Rails (object):
+	def __init__(self, world, margin = 200.0):
+		self.world = world
+		self.margin = margin
+		self.bodies = []
+		self.groups = None # built lazily after bodies are added or removed
+		self.anchors = None # (N, 2) array of where the bodies were put in the spatial index
+	def __len__(self):
+		return len(self.bodies)
+	def add(self, body):
+		self.bodies.append(body)
+		self.groups = None
+	def remove(self, body):
+		self.bodies.remove(body)
+		self.groups = None
+	def build(self):
+		# bodies by depth, so a center has moved before anything that goes around it,
+		# and within a depth by kind of path, so each kind is evaluated in one call
+		moving = set(id(body) for body in self.bodies)
+		def depth(body):
+			d = 0
+			center = body.path.center
+			while center != None and id(center) in moving:
+				d += 1
+				center = center.path.center
+			return d
+		index = dict((id(body), i) for i, body in enumerate(self.bodies))
+		levels = {}
+		for i, body in enumerate(self.bodies):
+			levels.setdefault(depth(body), []).append(i)
+		paths = self.paths = [body.path for body in self.bodies]
+		# where each body's center is: another body on rails (its index), or a fixed point
+		self.center_index = np.array([index.get(id(p.center), -1) if p.center != None else -1 for p in paths])
+		# the groups are laid out one after the other, so each works on a slice of the rows positions computes in.
+		# after the bodies come a row of zeros for bodies without a center and a row for each center that stands still
+		self.groups = []
+		order = []
+		def group(kind, members, data):
+			self.groups.append((kind, len(order), len(order) + len(members), data))
+			order.extend(members)
+		for d in sorted(levels):
+			circular = []
+			kepler = []
+			sampled = {}
+			other = []
+			for i in levels[d]:
+				path = paths[i]
+				if isinstance(path, KeplerPath):
+					(kepler if path.e else circular).append(i)
+				elif isinstance(path, SampledPath):
+					sampled.setdefault(path.samples, []).append(i)
+				else:
+					other.append(i)
+			if circular:
+				# no kepler equation to solve: the angle goes round evenly
+				group("circular", circular, dict(
+					a = np.array([paths[i].a for i in circular]),
+					argument = np.array([paths[i].argument for i in circular]),
+					direction = np.array([2*np.pi*paths[i].direction for i in circular], dtype = float)))
+			if kepler:
+				group("kepler", kepler, dict(
+					a = np.array([paths[i].a for i in kepler]),
+					e = np.array([paths[i].e for i in kepler]),
+					c = np.cos([paths[i].argument for i in kepler]),
+					s = np.sin([paths[i].argument for i in kepler]),
+					direction = np.array([paths[i].direction for i in kepler], dtype = float)))
+			for samples, members in sorted(sampled.items()):
+				group("sampled", members, dict(samples = samples, tables = np.array([paths[i].table for i in members])))
+			for i in other:
+				group("path", [i], None)
+		n = len(self.bodies)
+		self.order = np.array(order, dtype = int) # row -> body
+		self.rows = np.argsort(self.order) # body -> row
+		self.fixed_centers = []
+		fixed = {}
+		center_rows = []
+		for i in order:
+			center = paths[i].center
+			if center == None:
+				center_rows.append(n)
+			elif self.center_index[i] >= 0:
+				center_rows.append(self.rows[self.center_index[i]])
+			else:
+				if id(center) not in fixed:
+					fixed[id(center)] = n + 1 + len(self.fixed_centers)
+					self.fixed_centers.append(center)
+				center_rows.append(fixed[id(center)])
+		self.center_rows = np.array(center_rows, dtype = int)
+		self.anchors = None
+		self.phase = np.array([p.phase for p in paths], dtype = float)
+		self.speed = np.array([p.speed for p in paths], dtype = float)
+	def positions(self, time):
+		# (N, 2) array of where every body on rails is at time, in the order of self.bodies
+		if self.groups == None:
+			self.build()
+		n = len(self.bodies)
+		progress = self.phase + time*self.speed
+		ts = progress[self.order]
+		rows = np.zeros((n + 1 + len(self.fixed_centers), 2))
+		if self.fixed_centers:
+			rows[n + 1:] = [(c.position.x, c.position.y) for c in self.fixed_centers]
+		for kind, start, end, data in self.groups:
+			t = ts[start:end]
+			offsets = rows[start:end]
+			if kind == "circular":
+				angle = data["direction"]*t + data["argument"]
+				offsets[:, 0] = data["a"]*np.cos(angle)
+				offsets[:, 1] = data["a"]*np.sin(angle)
+			elif kind == "kepler":
+				e = data["e"]
+				big_e = eccentric_anomaly(2*np.pi*t, e)
+				x = data["a"]*(np.cos(big_e) - e)
+				y = data["direction"]*data["a"]*np.sqrt(1 - e*e)*np.sin(big_e)
+				offsets[:, 0] = data["c"]*x - data["s"]*y
+				offsets[:, 1] = data["s"]*x + data["c"]*y
+			elif kind == "sampled":
+				u = np.mod(t, 1.0)*data["samples"]
+				i = np.minimum(u.astype(int), data["samples"] - 1)
+				f = (u - i)[:, None]
+				members = np.arange(end - start)
+				offsets[:] = data["tables"][members, i]*(1 - f) + data["tables"][members, i + 1]*f
+			else:
+				offsets[:] = self.paths[self.order[start]].offsets(t)
+			# centers are in an earlier group, so they're placed already
+			offsets += rows[self.center_rows[start:end]]
+		return rows[self.rows], progress
+	def velocity(self, body, time, h = 1.0):
+		# how far a body on rails moves per reference tick around time, from where its path puts it h ticks apart.
+		# goes up the centers on rails, so a moon's velocity includes its planet's
+		path = body.path
+		progress = path.phase + np.array([time - h, time])*path.speed
+		(x0, y0), (x1, y1) = path.offsets(progress).tolist()
+		v = Vector2((x1 - x0)/h, (y1 - y0)/h)
+		if path.center != None and path.center.path != None:
+			v += self.velocity(path.center, time, h)
+		return v
+	def update(self, time):
+		# moves every body on rails to where it is at time
+		if not self.bodies:
+			return
+		positions, progress = self.positions(time)
+		world = self.world
+		world.gravity.move(self.bodies, positions)
+		xs = positions[:, 0].tolist()
+		ys = positions[:, 1].tolist()
+		# written back by map, without a python loop over the bodies
+		list(map(setattr, self.bodies, repeat("position"), map(Point, xs, ys)))
+		list(map(setattr, self.paths, repeat("progress"), progress.tolist()))
+		if self.anchors is None:
+			moved = range(len(self.bodies))
+			self.anchors = positions.copy()
+		else:
+			d = positions - self.anchors
+			moved = np.nonzero(np.einsum("ij,ij->i", d, d) > self.margin*self.margin)[0]
+			self.anchors[moved] = positions[moved]
+			moved = moved.tolist()
+		spatial = world.spatial
+		for i in moved:
+			body = self.bodies[i]
+			spatial.update(body, xs[i], ys[i], body.radius + self.margin)
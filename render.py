@@ -0,0 +1,384 @@
+# coding: utf-8
+# retained mode drawing. the scene_drawing style functions in here record into the current DisplayList
+# instead of drawing right away; DisplayList.submit sorts the frame's commands by layer, keeping the order they were
+# drawn in within a layer so overlapping shapes still cover each other the same way, and hands them to a backend in
+# batches of consecutive commands with the same drawing state (texture, fill, stroke, tint, transform), setting each
+# state once per batch. the layers keep what's drawn together in a frame, like the ship's flames, together.
+# SceneBackend draws with pythonista's scene module, PILBackend rasterizes offscreen into a PIL image.
+# outside of a display list the functions draw immediately, like the scene ones they stand in for.
+# drawing modules import this after scene (and after anything else that star-imports scene), so their calls land here
+import os
+from math import sqrt, atan2, degrees, hypot
+import numpy as np
+import scene
+from PIL import Image, ImageDraw, ImageFont
+
+__all__ = ["background", "fill", "no_fill", "stroke", "no_stroke", "stroke_weight", "tint", "no_tint", "ellipse", "rect", "line", "triangle_strip", "text", "push_matrix", "pop_matrix", "translate", "scale", "layer", "DisplayList", "SceneBackend", "PILBackend", "stars_layer", "celestials_layer", "ship_layer", "debug_layer", "ui_layer"]
+
+# layers, drawn from low to high
+stars_layer = 1
+celestials_layer = 2
+ship_layer = 3
+debug_layer = 4
+ui_layer = 5
+
+identity = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+def multiply(m, n):
+	# affine matrices (a, b, c, d, e, f): x' = a*x + c*y + e, y' = b*x + d*y + f. n is applied first
+	a, b, c, d, e, f = m
+	a2, b2, c2, d2, e2, f2 = n
+	return (a*a2 + c*b2, b*a2 + d*b2, a*c2 + c*d2, b*c2 + d*d2, a*e2 + c*f2 + e, b*e2 + d*f2 + f)
+
+def color(args):
+	# (r, g, b, a) from any of the ways fill and friends take a color: gray, (gray, alpha), r, g, b(, a) or a tuple
+	if len(args) == 1:
+		args = args[0]
+		if not isinstance(args, (tuple, list)):
+			args = (args,)
+	args = tuple(float(v) for v in args)
+	if len(args) == 1:
+		args = (args[0], args[0], args[0], 1.0)
+	elif len(args) == 2:
+		args = (args[0], args[0], args[0], args[1])
+	elif len(args) == 3:
+		args += (1.0,)
+	return args
+
+class DisplayList (object):
+	current = None # the list being recorded into
+	def __init__(self):
+		self.commands = []
+		self.background = None
+		self.fill = (1.0, 1.0, 1.0, 1.0)
+		self.stroke = None
+		self.stroke_weight = 0.0
+		self.tint = (1.0, 1.0, 1.0, 1.0)
+		self.matrix = identity
+		self.stack = []
+		self.layer = 0
+		self.previous = None
+	def __enter__(self):
+		self.previous = DisplayList.current
+		DisplayList.current = self
+		return self
+	def __exit__(self, *exc_info):
+		DisplayList.current = self.previous
+	def __len__(self):
+		return len(self.commands)
+	def add(self, kind, args, texture = ""):
+		stroke = self.stroke if self.stroke != None and self.stroke_weight > 0 else ()
+		state = (texture, self.fill or (), stroke, self.stroke_weight if stroke else 0.0, self.tint, self.matrix)
+		self.commands.append((self.layer, state, len(self.commands), kind, args))
+	def batches(self):
+		# [(state, [(kind, args), ...]), ...] in drawing order: by layer, then in the order they came in.
+		# only neighbouring commands share a batch, so nothing moves above or below something it overlaps
+		batches = []
+		last = None
+		for layer, state, order, kind, args in sorted(self.commands, key = lambda command: (command[0], command[2])):
+			if (layer, state) != last:
+				batches.append((state, []))
+				last = (layer, state)
+			batches[-1][1].append((kind, args))
+		return batches
+	def submit(self, backend):
+		backend.begin(self.background)
+		for state, commands in self.batches():
+			backend.set_state(*state)
+			for kind, args in commands:
+				getattr(backend, kind)(*args)
+		backend.end()
+		return backend
+
+def background(*args):
+	d = DisplayList.current
+	if d == None:
+		return scene.background(*args)
+	d.background = color(args)
+
+def fill(*args):
+	d = DisplayList.current
+	if d == None:
+		return scene.fill(*args)
+	d.fill = color(args)
+
+def no_fill():
+	d = DisplayList.current
+	if d == None:
+		return scene.no_fill()
+	d.fill = None
+
+def stroke(*args):
+	d = DisplayList.current
+	if d == None:
+		return scene.stroke(*args)
+	d.stroke = color(args)
+
+def no_stroke():
+	d = DisplayList.current
+	if d == None:
+		return scene.no_stroke()
+	d.stroke = None
+
+def stroke_weight(weight):
+	d = DisplayList.current
+	if d == None:
+		return scene.stroke_weight(weight)
+	d.stroke_weight = float(weight)
+
+def tint(*args):
+	d = DisplayList.current
+	if d == None:
+		return scene.tint(*args)
+	d.tint = color(args)
+
+def no_tint():
+	d = DisplayList.current
+	if d == None:
+		return scene.no_tint()
+	d.tint = (1.0, 1.0, 1.0, 1.0)
+
+def ellipse(x, y, w, h):
+	d = DisplayList.current
+	if d == None:
+		return scene.ellipse(x, y, w, h)
+	d.add("ellipse", (x, y, w, h))
+
+def rect(x, y, w, h):
+	d = DisplayList.current
+	if d == None:
+		return scene.rect(x, y, w, h)
+	d.add("rect", (x, y, w, h))
+
+def line(x1, y1, x2, y2):
+	d = DisplayList.current
+	if d == None:
+		return scene.line(x1, y1, x2, y2)
+	d.add("line", (x1, y1, x2, y2))
+
+def triangle_strip(points, tex_coords = None, image = None):
+	d = DisplayList.current
+	if d == None:
+		if image == None:
+			return scene.triangle_strip(points)
+		return scene.triangle_strip(points, tex_coords, image)
+	d.add("triangle_strip", (points, tex_coords, image), image or "")
+
+def text(txt, font_name = "Helvetica", font_size = 16.0, x = 0.0, y = 0.0, alignment = 5):
+	d = DisplayList.current
+	if d == None:
+		return scene.text(txt, font_name, font_size, x, y, alignment)
+	d.add("text", (txt, font_name, font_size, x, y, alignment))
+
+def push_matrix():
+	d = DisplayList.current
+	if d == None:
+		return scene.push_matrix()
+	d.stack.append(d.matrix)
+
+def pop_matrix():
+	d = DisplayList.current
+	if d == None:
+		return scene.pop_matrix()
+	d.matrix = d.stack.pop()
+
+def translate(x, y):
+	d = DisplayList.current
+	if d == None:
+		return scene.translate(x, y)
+	d.matrix = multiply(d.matrix, (1.0, 0.0, 0.0, 1.0, x, y))
+
+def scale(x, y = None):
+	if y == None:
+		y = x
+	d = DisplayList.current
+	if d == None:
+		return scene.scale(x, y)
+	d.matrix = multiply(d.matrix, (x, 0.0, 0.0, y, 0.0, 0.0))
+
+def layer(n):
+	# everything recorded from here on goes in layer n
+	d = DisplayList.current
+	if d != None:
+		d.layer = n
+
+class SceneBackend (object):
+	# replays a display list with the scene module
+	def begin(self, background):
+		if background != None:
+			scene.background(*background[:3])
+		self.matrix = identity
+		self.pushed = False
+		self.state_changes = 0
+	def set_state(self, texture, fill, stroke, weight, tint, matrix):
+		self.state_changes += 1
+		if fill:
+			scene.fill(*fill)
+		else:
+			scene.no_fill()
+		if stroke:
+			scene.stroke(*stroke)
+			scene.stroke_weight(weight)
+		else:
+			scene.no_stroke()
+			scene.stroke_weight(0)
+		scene.tint(*tint)
+		if matrix != self.matrix:
+			if self.pushed:
+				scene.pop_matrix()
+				self.pushed = False
+			if matrix != identity:
+				# translation, rotation and (non uniform) scale; the drawing code never shears
+				a, b, c, d, e, f = matrix
+				sx = hypot(a, b)
+				scene.push_matrix()
+				scene.translate(e, f)
+				scene.rotate(degrees(atan2(b, a)))
+				scene.scale(sx, (a*d - b*c)/sx)
+				self.pushed = True
+			self.matrix = matrix
+	def end(self):
+		if self.pushed:
+			scene.pop_matrix()
+	def ellipse(self, x, y, w, h):
+		scene.ellipse(x, y, w, h)
+	def rect(self, x, y, w, h):
+		scene.rect(x, y, w, h)
+	def line(self, x1, y1, x2, y2):
+		scene.line(x1, y1, x2, y2)
+	def triangle_strip(self, points, tex_coords, image):
+		if image == None:
+			scene.triangle_strip(points)
+		else:
+			scene.triangle_strip(points, tex_coords, image)
+	def text(self, txt, font_name, font_size, x, y, alignment):
+		scene.text(txt, font_name, font_size, x, y, alignment)
+
+def rgba(c):
+	return tuple(int(round(min(max(v, 0.0), 1.0)*255)) for v in c)
+
+class PILBackend (object):
+	# rasterizes a display list into self.image, an RGBA PIL image of width x height pixels.
+	# scene's y axis points up, PIL's down, so y is flipped. textures are looked up relative to root
+	def __init__(self, width, height, root = None):
+		self.size = (int(width), int(height))
+		self.root = root if root != None else os.path.dirname(os.path.abspath(__file__))
+		self.textures = {}
+		self.image = None
+	def begin(self, background):
+		self.image = Image.new("RGBA", self.size, rgba(background if background != None else (0, 0, 0, 1)))
+		# blends what's drawn over what's there, so translucent fills work
+		self.draw = ImageDraw.Draw(self.image, "RGBA")
+		self.state_changes = 0
+	def end(self):
+		self.draw = None
+	def save(self, path):
+		self.image.save(path)
+	def set_state(self, texture, fill, stroke, weight, tint, matrix):
+		self.state_changes += 1
+		self.fill = rgba(fill) if fill else None
+		self.stroke = rgba(stroke) if stroke else None
+		self.matrix = matrix
+		a, b, c, d = matrix[:4]
+		self.width = int(round(weight*sqrt(abs(a*d - b*c)))) if stroke else 0
+		if self.stroke != None:
+			self.width = max(self.width, 1)
+		self.tint = tint
+	def point(self, x, y):
+		a, b, c, d, e, f = self.matrix
+		return (a*x + c*y + e, self.size[1] - (b*x + d*y + f))
+	def ellipse(self, x, y, w, h):
+		a, b, c, d = self.matrix[:4]
+		cx, cy = self.point(x + w/2.0, y + h/2.0)
+		rx = abs(w)/2.0*hypot(a, b)
+		ry = abs(h)/2.0*hypot(c, d)
+		if self.fill == None and self.stroke == None:
+			return
+		self.draw.ellipse((cx - rx, cy - ry, cx + rx, cy + ry), fill = self.fill, outline = self.stroke, width = self.width)
+	def rect(self, x, y, w, h):
+		corners = [self.point(x, y), self.point(x + w, y), self.point(x + w, y + h), self.point(x, y + h)]
+		self.draw.polygon(corners, fill = self.fill, outline = self.stroke, width = self.width)
+	def line(self, x1, y1, x2, y2):
+		if self.stroke != None:
+			self.draw.line((self.point(x1, y1), self.point(x2, y2)), fill = self.stroke, width = self.width)
+	def texture(self, name):
+		if name not in self.textures:
+			self.textures[name] = Image.open(os.path.join(self.root, name)).convert("RGBA")
+		return self.textures[name]
+	def triangle_strip(self, points, tex_coords, image):
+		if isinstance(points, np.ndarray):
+			# floats are much quicker to work with one at a time than numpy scalars
+			points = points.tolist()
+		if isinstance(tex_coords, np.ndarray):
+			tex_coords = tex_coords.tolist()
+		points = [self.point(p[0], p[1]) for p in points]
+		if image == None:
+			if self.fill == None:
+				return
+			for i in range(len(points) - 2):
+				triangle = points[i:i + 3]
+				if area(triangle) != 0:
+					self.draw.polygon(triangle, fill = self.fill)
+			return
+		texture = self.texture(image)
+		if self.tint != (1.0, 1.0, 1.0, 1.0):
+			texture = Image.fromarray((np.asarray(texture)*np.array(self.tint)).astype(np.uint8))
+		w, h = texture.size
+		texels = None
+		flat = None # (texture coordinates, color) of the last flat triangle
+		for i in range(len(points) - 2):
+			triangle = points[i:i + 3]
+			if area(triangle) == 0:
+				continue
+			a, b, c = tex_coords[i:i + 3]
+			if a[0] == b[0] == c[0] and a[1] == b[1] == c[1]:
+				# all on one texel, like the particles' ramp: a flat fill
+				if flat == None or flat[0] != a:
+					if texels is None:
+						texels = np.asarray(texture)
+					x = min(max(int(a[0]*w), 0), w - 1)
+					y = min(max(int((1 - a[1])*h), 0), h - 1)
+					flat = (a, tuple(texels[y, x].tolist()))
+				self.draw.polygon(triangle, fill = flat[1])
+				continue
+			uvs = [(u*w, (1 - v)*h) for u, v in (tex_coords[i + k] for k in range(3))]
+			self.textured_triangle(texture, triangle, uvs)
+	def textured_triangle(self, texture, triangle, uvs):
+		# maps the texture onto the triangle with the affine transform that takes its corners to uvs
+		x0 = int(min(p[0] for p in triangle))
+		y0 = int(min(p[1] for p in triangle))
+		x1 = int(max(p[0] for p in triangle)) + 1
+		y1 = int(max(p[1] for p in triangle)) + 1
+		if x1 <= 0 or y1 <= 0 or x0 >= self.size[0] or y0 >= self.size[1]:
+			return
+		size = (x1 - x0, y1 - y0)
+		# PIL wants the inverse: the texture position for every output pixel
+		m = np.array([(p[0] - x0, p[1] - y0, 1.0) for p in triangle])
+		coefficients = np.linalg.solve(m, np.array(uvs))
+		data = (coefficients[0, 0], coefficients[1, 0], coefficients[2, 0], coefficients[0, 1], coefficients[1, 1], coefficients[2, 1])
+		patch = texture.transform(size, Image.AFFINE, data, Image.BILINEAR)
+		mask = Image.new("L", size, 0)
+		ImageDraw.Draw(mask).polygon([(p[0] - x0, p[1] - y0) for p in triangle], fill = 255)
+		alpha = np.minimum(np.asarray(patch)[:, :, 3], np.asarray(mask))
+		patch.putalpha(Image.fromarray(alpha))
+		self.image.alpha_composite(patch, (x0, y0)) if x0 >= 0 and y0 >= 0 else self.paste_clipped(patch, x0, y0)
+	def paste_clipped(self, patch, x0, y0):
+		# alpha_composite can't take negative offsets
+		left = max(0, -x0)
+		top = max(0, -y0)
+		self.image.alpha_composite(patch, (x0 + left, y0 + top), (left, top))
+	def text(self, txt, font_name, font_size, x, y, alignment):
+		try:
+			font = ImageFont.load_default(font_size)
+		except TypeError:
+			# older PIL: one fixed size
+			font = ImageFont.load_default()
+		# alignment is laid out like a numeric keypad: which side of (x, y) the text goes, 5 centered on it
+		column = (alignment - 1) % 3
+		row = (alignment - 1)//3
+		anchor = "rml"[column] + "amd"[row]
+		self.draw.multiline_text(self.point(x, y), txt, fill = rgba(self.tint), font = font, anchor = anchor, align = ("right", "center", "left")[column])
+
+def area(triangle):
+	(ax, ay), (bx, by), (cx, cy) = triangle
+	return (bx - ax)*(cy - ay) - (by - ay)*(cx - ax)
@@ -0,0 +1,39 @@
+# coding: utf-8
+
+class FixedTimestep (object):
+	# decouples physics ticks from rendered frames.
+	# elapsed wall time is collected in an accumulator and spent in ticks of exactly tick_length seconds;
+	# what's left over (alpha, 0 to 1) is how far the frame is between the last two ticks.
+	def __init__(self, tick_rate = 60.0, max_ticks = 5):
+		self.tick_rate = float(tick_rate)
+		self.tick_length = 1.0/self.tick_rate
+		self.max_ticks = max_ticks # at most this many catch up ticks per frame, so a slow frame can't snowball
+		self.accumulator = 0.0
+		self.ticks = 0
+		self.dropped = 0.0 # seconds of backlog thrown away because of max_ticks
+	def advance(self, elapsed):
+		# returns how many ticks to run for elapsed seconds of wall time
+		self.accumulator += elapsed
+		n = int(self.accumulator/self.tick_length)
+		if self.max_ticks != None and n > self.max_ticks:
+			n = self.max_ticks
+		self.accumulator -= n*self.tick_length
+		if self.accumulator >= self.tick_length:
+			backlog = self.accumulator
+			self.accumulator %= self.tick_length
+			self.dropped += backlog - self.accumulator
+		self.ticks += n
+		return n
+	@property
+	def alpha(self):
+		return self.accumulator/self.tick_length
+	def reset(self):
+		self.accumulator = 0.0
+	def run(self, elapsed, tick):
+		# calls tick() for every tick due and returns alpha for rendering.
+		# tick may return False to stop early, e.g. when the game pauses
+		for i in range(self.advance(elapsed)):
+			if tick() == False:
+				self.reset()
+				break
+		return self.alpha
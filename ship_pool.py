@@ -0,0 +1,182 @@
+# coding: utf-8
+# many ships in flat arrays, stepped all at once.
+# ShipPool.step does what Ship.step does for one ship (semi-implicit euler movement, swept hull contact,
+# the bounce and the landing counter) for every ship in the pool, without any per ship python objects.
+import numpy as np
+
+import batched_vector_operations as bvo
+from vehicles import Ship, bouncespeed, planet_land_delay, deltat_for_impulse
+from integrators import angular_friction
+
+class ShipPool (object):
+	def __init__(self, n, shape = Ship.shape, mass = 10, thrust_force = .1, rotate_force = .003):
+		self.n = n
+		self.shape = shape
+		self.mass = float(mass)
+		self.m_i = shape.moment_of_inertia(mass)
+		self.thrust_force = np.full(n, thrust_force, dtype = float) # per ship, so sweeps can vary it
+		self.rotate_force = np.full(n, rotate_force, dtype = float)
+		self.bouncespeed = bouncespeed
+		self.planet_land_delay = planet_land_delay
+		self.position = np.zeros((n, 2))
+		self.velocity = np.zeros((n, 2))
+		self.acceleration = np.zeros((n, 2))
+		self.angle = np.zeros(n)
+		self.v_angle = np.zeros(n)
+		self.a_angle = np.zeros(n) # rotation input, like Ship.a_angle
+		self.accelerating = np.zeros(n, dtype = bool)
+		self.landed = np.zeros(n, dtype = int)
+		self.planet_landed = np.full(n, -1, dtype = int) # index into the field's bodies, -1 when not landed
+		self.ticks = 0
+		self.landings = [] # (tick, ship index, body) for every landing, in order
+		self.block_size = 1000000 # max number of ship-body pairs tested at once in the broadphase
+	def accelerate(self, ships, state):
+		# ships is anything that indexes the arrays: an index, a slice or a mask
+		self.accelerating[ships] = state
+		if state:
+			self.landed[ships] = 0
+	def rotate_left(self, ships, state):
+		self.a_angle[ships] = self.rotate_force[ships] if state else 0
+	def rotate_right(self, ships, state):
+		self.a_angle[ships] = -self.rotate_force[ships] if state else 0
+	def hulls(self, position, angle):
+		# world space collision hulls of every ship, (n, hull points, 2)
+		local = self.shape.hull_array
+		c = np.cos(angle)[:, None]
+		s = np.sin(angle)[:, None]
+		x = local[None, :, 0]
+		y = local[None, :, 1]
+		return np.stack((position[:, None, 0] + c*x - s*y, position[:, None, 1] + s*x + c*y), axis = -1)
+	def step(self, field, dt = 1.0):
+		# one tick of dt reference ticks against the bodies of a CelestialField
+		old_position = self.position
+		old_angle = self.angle
+
+		# angular, as in Integrator.angular
+		a_a = self.a_angle
+		v_a = self.v_angle + a_a*dt
+		coasting = (a_a == 0) & (v_a != 0)
+		v_a = np.where(coasting, v_a - np.sign(v_a)*np.minimum(np.abs(v_a), angular_friction*dt), v_a)
+		v_a = np.where(np.abs(v_a) < .0001, 0.0, v_a)
+		angle = old_angle + v_a*dt
+
+		# linear, as in SemiImplicitEuler
+		thrust = np.where(self.accelerating[:, None], np.stack((np.sin(-angle), np.cos(-angle)), axis = -1)*self.thrust_force[:, None], 0.0)
+		acc = thrust + field.calc_forces(old_position, self.mass)
+		velocity = self.velocity + acc*dt
+		position = old_position + velocity*dt
+
+		hit = self.collide(field, old_position, old_angle, position, angle, velocity, v_a, dt)
+
+		self.landed = np.where(hit, self.landed + 1, 0)
+		self.planet_landed[~hit] = -1
+		new = hit & (self.landed*dt > self.planet_land_delay) & (self.planet_landed == -1)
+		for i in np.nonzero(new)[0]:
+			self.planet_landed[i] = self.last_hit[i]
+			self.landings.append((self.ticks, int(i), field.bodies[self.last_hit[i]]))
+		self.position = position
+		self.velocity = velocity
+		self.acceleration = acc
+		self.angle = angle
+		self.v_angle = v_a
+		self.ticks += 1
+	def candidate_pairs(self, field, position, reach):
+		# (ship, body) index pairs whose bounding circles overlap, ordered by ship and then body
+		ships = []
+		bodies = []
+		if field.n == 0:
+			return np.array(ships, dtype = int), np.array(bodies, dtype = int)
+		cx = field.positions[:field.n, 0]
+		cy = field.positions[:field.n, 1]
+		radii = field.radii[:field.n]
+		rows = max(1, self.block_size//field.n)
+		for start in range(0, self.n, rows):
+			dx = position[start:start + rows, 0, None] - cx
+			dy = position[start:start + rows, 1, None] - cy
+			dx *= dx
+			dy *= dy
+			dx += dy
+			limit = radii + reach[start:start + rows, None]
+			limit *= limit
+			i, j = np.nonzero(dx <= limit)
+			ships.append(i + start)
+			bodies.append(j)
+		return np.concatenate(ships), np.concatenate(bodies)
+	def collide(self, field, old_position, old_angle, position, angle, velocity, v_a, dt):
+		# swept hull contact and bounce, as in Ship.step. changes position, velocity and v_a in place
+		hit = np.zeros(self.n, dtype = bool)
+		self.last_hit = np.full(self.n, -1, dtype = int)
+		reach = self.shape.bound_radius + np.hypot(*(position - old_position).T)
+		ship_index, body_index = self.candidate_pairs(field, position, reach)
+		if len(ship_index) == 0:
+			return hit
+		starts = self.hulls(old_position, old_angle)[ship_index]
+		ends = self.hulls(position, angle)[ship_index]
+		centers = field.positions[body_index]
+		radii = field.radii[body_index]
+
+		# narrowphase for every pair and hull point at once
+		d = ends - starts
+		t_enter, t_exit, crossing = bvo.ray_circle(starts, d, centers[:, None, :], radii[:, None])
+		e = ends - centers[:, None, :]
+		end_inside = bvo.dot(e, e) <= (radii*radii)[:, None]
+		point_hit = end_inside | (crossing & (t_enter >= 0) & (t_enter <= 1))
+		pair_hit = point_hit.any(axis = 1)
+		if not pair_hit.any():
+			return hit
+		t_enter = np.where(crossing, t_enter, 0)
+		toi = np.where(point_hit, np.maximum(t_enter, 0), np.inf)
+		first = np.argmin(toi, axis = 1)
+
+		pairs = np.nonzero(pair_hit)[0]
+		ship_index = ship_index[pairs]
+		body_index = body_index[pairs]
+		k = np.arange(len(pairs))
+		first = first[pairs]
+		start = starts[pairs, first]
+		end = ends[pairs, first]
+		step = d[pairs, first]
+		center = centers[pairs]
+		radius = radii[pairs]
+
+		moved = bvo.dot(step, step) > 0
+		contact = np.where(moved[:, None], start + step*t_enter[pairs, first][:, None], 0)
+		out = start - center
+		out_length = np.hypot(out[:, 0], out[:, 1])
+		pushout = np.where(out_length[:, None] > 0, out/np.where(out_length > 0, out_length, 1)[:, None], (0.0, 1.0))
+		normal = np.where(moved[:, None], (contact - center)/radius[:, None], pushout)
+		contact = np.where(moved[:, None], contact, center + pushout*radius[:, None])
+
+		vec = end - start
+		moved_by = np.hypot(vec[:, 0], vec[:, 1])
+		vec = np.where(moved_by[:, None] > 0, vec/np.where(moved_by > 0, moved_by, 1)[:, None], vec)
+		deltat = deltat_for_impulse*dt
+
+		# a ship touching several bodies handles them one after the other, like Ship.step does,
+		# so the pairs are applied in rounds with at most one pair per ship
+		rank = np.zeros(len(pairs), dtype = int)
+		if len(pairs) > 1:
+			same = ship_index[1:] == ship_index[:-1]
+			for i in np.nonzero(same)[0]:
+				rank[i + 1] = rank[i] + 1
+		for r in range(rank.max() + 1):
+			p = k[rank == r]
+			s = ship_index[p]
+			to_center = position[s] - end[p]
+			speed = np.hypot(velocity[s, 0], velocity[s, 1])
+			bounce = bvo.reflect(vec[p]*speed[:, None], normal[p])
+			bounce_delta = bounce*self.bouncespeed - velocity[s]
+			deltav = np.where(np.hypot(bounce[:, 0], bounce[:, 1]) > 100, np.hypot(bounce_delta[:, 0], bounce_delta[:, 1]), speed)
+			force = normal[p]*((self.mass*deltav)/deltat)[:, None]
+			torque = bvo.cross(force, -1*to_center)
+			v_a[s] += -(torque/self.m_i)*deltat
+			force = np.hypot(force[:, 0], force[:, 1])
+			# pushed away from the body from where the ship is put back to, as in Ship.step
+			position[s] = contact[p] + to_center
+			forcenormal = position[s] - center[p]
+			length = np.hypot(forcenormal[:, 0], forcenormal[:, 1])
+			forcenormal = np.where(length[:, None] > 0, forcenormal/np.where(length > 0, length, 1)[:, None], normal[p])
+			velocity[s] += forcenormal*((force*deltat)/self.mass)[:, None]
+			hit[s] = True
+			self.last_hit[s] = body_index[p]
+		return hit
@@ -0,0 +1,109 @@
+# coding: utf-8
+# headless world stepper: runs the ship physics as fast as possible without drawing.
+# works without pythonista; the scene module is replaced by headless.py when it's missing.
+import headless
+headless.install()
+
+from scene import *
+import random
+
+from vehicles import *
+from celestials import *
+from world import *
+from scheduler import *
+from timewarp import *
+from render import *
+
+controls = ("accelerate", "rotate_left", "rotate_right")
+
+def planet_grid(rng = random, spacing = 2000, n = 5):
+	# the same layout SpaceAdventure.setup builds: a grid of planets with a gap at the origin
+	planets = []
+	for x in range(-n, n):
+		for y in range(-n, n):
+			if not (x == 0 and y == 0):
+				planets.append(Planet(x*spacing, y*spacing, radius = 500 + rng.random()*400))
+	return planets
+
+class InputScript (object):
+	def __init__(self, events = None):
+		# events is a list of (tick, control, state) tuples,
+		# where control is one of the names in controls and state is the button state
+		self.events = {}
+		for tick, control, state in events or []:
+			self.add(tick, control, state)
+	def add(self, tick, control, state):
+		if control not in controls:
+			raise ValueError("Unknown control: %s" % control)
+		self.events.setdefault(tick, []).append((control, state))
+	def apply(self, tick, vehicle):
+		for control, state in self.events.get(tick, ()):
+			getattr(vehicle, control)(state)
+
+class HeadlessGame (World):
+	# stands in for SpaceAdventure: has everything a Ship expects from its game
+	def __init__(self, celestials = None, inputs = None, x = 0, y = 0, bounds = None, tick_rate = 60, integrator = None):
+		if bounds == None:
+			bounds = Rect(0, 0, 1024, 768)
+		self.bounds = bounds
+		self.scheduler = FixedTimestep(tick_rate, max_ticks = None)
+		self.time_warp = TimeWarp(self)
+		self.debug_info = None
+		self.debug_mode = False
+		self.set_celestials(celestials if celestials != None else [])
+		self.inputs = inputs if inputs != None else InputScript()
+		self.vehicle = Ship(self, x, y)
+		if integrator != None:
+			self.vehicle.integrator = integrator
+		self.ticks = 0
+		self.landings = []
+		self.spawner = None
+	def stream(self, seed, **kwargs):
+		# stream a procedural universe around the ship instead of using a fixed celestial list
+		self.spawner = SolarSystemSpawner(self, seed, **kwargs)
+		self.spawner.update(self.view_rect, self.vehicle.position)
+	@property
+	def view_rect(self):
+		r = Rect(0, 0, self.bounds.w, self.bounds.h)
+		r.center(self.vehicle.position)
+		return r
+	@property
+	def tick_dt(self):
+		# length of a scheduler tick in the reference ticks the physics constants are tuned for
+		return self.scheduler.tick_length/deltat_for_impulse
+	def landed_on(self, planet):
+		self.landings.append((self.ticks, planet))
+	def step(self, ticks = 1):
+		vehicle = self.vehicle
+		dt = self.tick_dt
+		for i in range(ticks):
+			self.inputs.apply(self.ticks, vehicle)
+			if self.spawner != None:
+				self.spawner.update(self.view_rect, vehicle.position)
+			self.time_warp.step(vehicle, dt)
+			self.ticks += 1
+			if self.profiler:
+				# every tick is a frame
+				self.profiler.end_frame()
+	def advance(self, seconds):
+		# simulate seconds of game time in fixed ticks; returns the number of ticks run
+		ticks = self.scheduler.advance(seconds)
+		self.step(ticks)
+		return ticks
+	def render(self, backend = None):
+		# draws the view around the ship into backend, a PILBackend the size of bounds by default, and returns it
+		if backend == None:
+			backend = PILBackend(self.bounds.w, self.bounds.h)
+		view = self.view_rect
+		frame = DisplayList()
+		with frame:
+			background(.01, .0, .08)
+			push_matrix()
+			translate(-view.x, -view.y)
+			layer(celestials_layer)
+			for c in self.visible_celestials(view):
+				c.draw()
+			layer(ship_layer)
+			self.vehicle.render()
+			pop_matrix()
+		return frame.submit(backend)
@@ -11,30 +11,14 @@ from vehicles import *
 from celestials import *
 from contexts import *
 from global_constants import *
+from world import *
+from scheduler import *
+from timewarp import *
+from prediction import *
+from profiler import *
+from render import *
 			
-def distribution(x):
-	d = abs(x - 1.5)
-	if d < .1:
-		n = 1
-	elif d < .2:
-		n = 3
-	elif d < .40:
-		n = 5
-	else:
-		n = 7
-	return ((x*2 - 1)**n + 1)/2.0
-
-def generate(min, max):
-	l = max - min
-	return min + l*distribution(random.random())
-
-# remember to add distribution skew function!
-# which means:
-# for example a planet with a higher mass would have the bell curve scooted over so that it would have more moons more often than a planet with less mass, which would have less moons far more often (almost always 0 for a small planet)
-# then say for that small planet which happened to spawn a moon, it will spawn small, because of the skewing of the original spawn
-# so skewing will inherit among class delegation for the solar system generation classes.
-	
-class SpaceAdventure (Scene):
+class SpaceAdventure (Scene, World):
 	@property
 	def vehicle(self):
 		return self._vehicle
@@ -45,6 +29,8 @@ class SpaceAdventure (Scene):
 		
 	def setup(self):
 		self.context = blankcontext
+		# frames are recorded into a display list and drawn in batches of the same state
+		self.renderer = SceneBackend()
 		
 		### DEBUG CODE v
 		class DebugInfo (object):
@@ -121,17 +107,22 @@ class SpaceAdventure (Scene):
 		self.debug_mode = False
 		### DEBUG CODE ^
 		
+		self.scheduler = FixedTimestep(tick_rate = 60, max_ticks = 5)
+		self.time_warp = TimeWarp(self)
 		self.vehicle = Ship(self, 0, 0)
+		if profile:
+			self.profiler = Profiler()
+		if debug:
+			self.vehicle.predictor = TrajectoryPredictor(self.vehicle)
 		self.view_rect = self.scale(self.bounds, 1.5)
 		self.view_rect.center(self.vehicle.position)
 		self.view_scale = 1.5
 		
-		self.celestials = []
-		for x in range(-5, 5):
-			for y in range(-5, 5):
-				if not (x == 0 and y == 0):
-					self.celestials.append(Planet(x*2000, y*2000, radius = 500 + random.random()*400))
-		#self.stars = Stars(self)
+		self.set_celestials([])
+		seed = random.getrandbits(32)
+		self.spawner = SolarSystemSpawner(self, seed)
+		self.spawner.update(self.view_rect, self.vehicle.position)
+		self.stars = Stars(self, seed)
 		self.started = True
 	
 	@property
@@ -170,34 +161,115 @@ class SpaceAdventure (Scene):
 	def draw(self):
 		if not hasattr(self, "started"):
 			return
-		background(.01, .0, .08)
-		self.draw_in_view_rect()
-		self.context.drawobject()
-		if debug:
-			self.debugcontext.drawobject()
-	def draw_in_view_rect(self):
+		p = self.profiler
+		if p:
+			p.start("frame")
+			p.start("physics")
+		alpha = self.run_physics(self.dt)
+		if p:
+			p.stop("physics")
+		frame = DisplayList()
+		with frame:
+			background(.01, .0, .08)
+			self.draw_in_view_rect(alpha)
+			layer(ui_layer)
+			if p:
+				p.start("ui")
+			self.context.drawobject()
+			if debug:
+				self.debugcontext.drawobject()
+				if p:
+					p.draw(10, self.bounds.h - 20)
+			if p:
+				p.stop("ui")
+		if p:
+			p.start("submit")
+		frame.submit(self.renderer)
+		if p:
+			p.stop("submit")
+			p.stop("frame")
+			p.end_frame()
+	def stop(self):
+		if self.profiler:
+			self.profiler.write("profile.json")
+	@property
+	def paused(self):
+		return self.debug_mode and self.debug_info.paused
+	@property
+	def tick_dt(self):
+		# length of a scheduler tick in the reference ticks the physics constants are tuned for
+		return self.scheduler.tick_length/deltat_for_impulse
+	def run_physics(self, elapsed):
+		# runs the physics ticks due after elapsed seconds and returns how far the frame is between the last two
+		if self.paused:
+			self.scheduler.reset()
+			if self.debug_info.advance > 0:
+				self.debug_info.advance -= 1
+				self.tick()
+			return 1.0
+		alpha = self.scheduler.run(elapsed, self.tick)
+		if self.debug_mode and self.debug_info.advance > 0:
+			self.debug_info.advance -= 1
+		return alpha
+	def tick(self):
+		# one physics tick, no drawing. returns False when the tick paused the game
+		self.spawner.update(self.view_rect, self.vehicle.position)
+		self.time_warp.step(self.vehicle, self.tick_dt)
+		return not self.paused
+	def run_ticks(self, n):
+		# advance the game by n ticks without rendering
+		for i in range(n):
+			if not self.tick():
+				break
+	def draw_in_view_rect(self, alpha = 1.0):
+		p = self.profiler
+		if p:
+			p.start("camera")
+		m = self.vehicle.interpolated_movement(alpha)
 		if not self.debug_mode:
-			target = min(1.5 + self.vehicle.speed/20.0, 3)
+			target = min(1.5 + abs(m.velocity)/20.0, 3)
 			self.view_scale += (target - self.view_scale)/100.0
 			self.view_rect = self.scale(self.bounds, self.view_scale)
-			self.view_rect.center(self.vehicle.position)
+			self.view_rect.center(m.position)
 		else:
 			self.view_rect = self.scale(self.bounds, self.debug_info.scale)
 			self.view_rect.center(self.debug_info.scroll)
+		if p:
+			p.stop("camera")
+			p.start("streaming")
+		self.spawner.update(self.view_rect, self.vehicle.position)
+		if p:
+			p.stop("streaming")
+			p.start("stars")
+		pixel_scale = self.bounds.w/self.view_rect.w
 		push_matrix()
-		scale(self.bounds.w/self.view_rect.w, self.bounds.h/self.view_rect.h)
+		scale(pixel_scale, self.bounds.h/self.view_rect.h)
 		translate(-self.view_rect.x, -self.view_rect.y)
-		#self.stars.drawobject()
-		if self.debug_mode and (self.debug_info.paused and self.debug_info.advance == 0):
-			for c in self.celestials:
-				c.draw()
+		layer(stars_layer)
+		self.stars.drawobject()
+		if p:
+			p.stop("stars")
+			p.start("celestials")
+		layer(celestials_layer)
+		# only what's on screen gets drawn; everything still pulls on the ship through self.gravity
+		visible = self.visible_celestials(self.view_rect)
+		if self.paused:
+			for c in visible:
+				c.draw(pixel_scale)
+		else:
+			for c in visible:
+				c.drawobject(pixel_scale)
+		if p:
+			p.stop("celestials")
+			p.count("celestials drawn", len(visible))
+			p.start("ship")
+		layer(ship_layer)
+		if self.paused:
 			self.vehicle.draw()
 		else:
-			for c in self.celestials:
-				c.drawobject()
-			self.vehicle.drawobject()
-			if self.debug_mode and self.debug_info.advance > 0:
-				self.debug_info.advance -= 1
+			self.vehicle.render(alpha)
+		if p:
+			p.stop("ship")
 		pop_matrix()
 	def touch_began(self, touch):
 		self.context.touch_began(touch)
@@ -0,0 +1,90 @@
+# coding: utf-8
+from math import floor
+
+class SpatialGrid (object):
+	# uniform grid over bounding circles.
+	# every object is stored in each cell its bounding box touches,
+	# queries return objects in the order they were added
+	def __init__(self, cell_size = 2000.0):
+		self.cell_size = float(cell_size)
+		self.cells = {}
+		self.entries = {} # id(obj) -> [order, obj, x, y, radius, cells, cell range]
+		self.counter = 0
+	def __len__(self):
+		return len(self.entries)
+	def __contains__(self, obj):
+		return id(obj) in self.entries
+	def cell_range(self, min_x, min_y, max_x, max_y):
+		s = self.cell_size
+		return int(floor(min_x/s)), int(floor(min_y/s)), int(floor(max_x/s)), int(floor(max_y/s))
+	def add(self, obj, x, y, radius):
+		x0, y0, x1, y1 = self.cell_range(x - radius, y - radius, x + radius, y + radius)
+		cells = []
+		for cx in range(x0, x1 + 1):
+			for cy in range(y0, y1 + 1):
+				key = (cx, cy)
+				if key not in self.cells:
+					self.cells[key] = []
+				self.cells[key].append(obj)
+				cells.append(key)
+		self.entries[id(obj)] = [self.counter, obj, x, y, radius, cells, (x0, y0, x1, y1)]
+		self.counter += 1
+	def remove(self, obj):
+		entry = self.entries.pop(id(obj))
+		for key in entry[5]:
+			cell = self.cells[key]
+			cell.remove(obj)
+			if not cell:
+				del self.cells[key]
+		return entry
+	def update(self, obj, x, y, radius):
+		entry = self.entries[id(obj)]
+		if self.cell_range(x - radius, y - radius, x + radius, y + radius) == entry[6]:
+			# still in the same cells
+			entry[2] = x
+			entry[3] = y
+			entry[4] = radius
+			return
+		order = self.remove(obj)[0]
+		self.add(obj, x, y, radius)
+		self.entries[id(obj)][0] = order
+	def clear(self):
+		self.cells = {}
+		self.entries = {}
+	def _gather(self, min_x, min_y, max_x, max_y):
+		x0, y0, x1, y1 = self.cell_range(min_x, min_y, max_x, max_y)
+		if (x1 - x0 + 1)*(y1 - y0 + 1) > len(self.cells):
+			# the query covers more cells than are occupied; walking the entries is cheaper
+			return list(self.entries.values())
+		found = {}
+		cells = self.cells
+		for cx in range(x0, x1 + 1):
+			for cy in range(y0, y1 + 1):
+				cell = cells.get((cx, cy))
+				if cell:
+					for obj in cell:
+						found[id(obj)] = obj
+		entries = self.entries
+		return [entries[i] for i in found]
+	def query_circle(self, x, y, radius):
+		# objects whose bounding circle overlaps the circle at (x, y)
+		hits = []
+		for entry in self._gather(x - radius, y - radius, x + radius, y + radius):
+			dx = entry[2] - x
+			dy = entry[3] - y
+			r = entry[4] + radius
+			if dx*dx + dy*dy <= r*r:
+				hits.append(entry)
+		hits.sort()
+		return [entry[1] for entry in hits]
+	def query_rect(self, min_x, min_y, max_x, max_y):
+		# objects whose bounding circle overlaps the rectangle
+		hits = []
+		for entry in self._gather(min_x, min_y, max_x, max_y):
+			x, y, r = entry[2], entry[3], entry[4]
+			dx = x - min(max(x, min_x), max_x)
+			dy = y - min(max(y, min_y), max_y)
+			if dx*dx + dy*dy <= r*r:
+				hits.append(entry)
+		hits.sort()
+		return [entry[1] for entry in hits]
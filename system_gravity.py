@@ -0,0 +1,153 @@
+# coding: utf-8
+# gravity from a tree of systems: suns -> planets -> moons, built from SolarSystem and PlanetMoonSystem,
+# with the solar systems (and bodies that aren't in any system) grouped into clusters of nearby ones above them.
+# every node has a sphere of influence (soi) around its center. inside it the node is opened: its central body
+# pulls exactly and its children are looked at in turn. from outside, the whole branch pulls as one mass at its
+# center of mass, like barnes-hut on the system tree. so a lookup costs about the depth of the tree times the
+# number of children per node, not the number of bodies.
+from math import sqrt
+
+from scene import Vector2
+
+class GravityNode (object):
+	def __init__(self, body = None, children = ()):
+		self.body = body # central body, None for clusters and the root
+		self.children = list(children)
+		self.soi = 0.0
+	def refresh(self):
+		# total mass, center of mass and extent of the branch
+		m = self.body.mass if self.body != None else 0.0
+		x = self.body.position.x*m if self.body != None else 0.0
+		y = self.body.position.y*m if self.body != None else 0.0
+		for child in self.children:
+			child.refresh()
+			m += child.mass
+			x += child.x*child.mass
+			y += child.y*child.mass
+		self.mass = m
+		self.x = x/m if m > 0 else 0.0
+		self.y = y/m if m > 0 else 0.0
+		# center of the soi: the central body, or the center of mass for clusters
+		if self.body != None:
+			self.cx = self.body.position.x
+			self.cy = self.body.position.y
+			self.extent = self.body.radius
+		else:
+			self.cx = self.x
+			self.cy = self.y
+			self.extent = 0.0
+		# radius of the circle around the center that holds the whole branch
+		for child in self.children:
+			dx = child.cx - self.cx
+			dy = child.cy - self.cy
+			self.extent = max(self.extent, sqrt(dx*dx + dy*dy) + child.extent)
+
+def equal_pull(distance, m, other):
+	# distance from a body of mass m to the point between it and a body of mass other where both pull the same
+	return distance*sqrt(m)/(sqrt(m) + sqrt(other))
+
+def system_node(system):
+	# a SolarSystem or PlanetMoonSystem as a tree
+	if hasattr(system, "sun"):
+		return GravityNode(system.sun, [system_node(s) for s in system.planet_systems])
+	return GravityNode(system.planet, [GravityNode(moon) for moon in system.moons])
+
+def cluster(nodes, size = 4):
+	# splits nodes at the median along the wider side until every group has at most size nodes
+	if len(nodes) <= size:
+		return nodes
+	xs = [node.body.position.x for node in nodes]
+	ys = [node.body.position.y for node in nodes]
+	axis = 0 if max(xs) - min(xs) >= max(ys) - min(ys) else 1
+	nodes = sorted(nodes, key = lambda node: (node.body.position.x, node.body.position.y)[axis])
+	half = len(nodes)//2
+	return [GravityNode(None, cluster(nodes[:half], size)), GravityNode(None, cluster(nodes[half:], size))]
+
+def set_soi(node, theta):
+	# a branch is only ever seen as one mass from further than extent/theta, like the barnes-hut opening angle.
+	# a body orbiting another also gets its laplace radius a*(m/M)**(2/5) if that's bigger,
+	# but never past the point where the parent pulls harder than the branch
+	for child in node.children:
+		child.soi = child.extent/theta
+		if node.body != None:
+			dx = child.cx - node.cx
+			dy = child.cy - node.cy
+			a = sqrt(dx*dx + dy*dy)
+			child.soi = max(child.soi, min(a*(child.mass/node.body.mass)**.4, equal_pull(a, child.mass, node.body.mass)))
+		set_soi(child, theta)
+
+class SystemGravity (object):
+	# a gravity provider like CelestialField (which it wraps, and passes everything but calc_force on to).
+	# systems is the list of SolarSystems and PlanetMoonSystems in the world; bodies of the field that aren't
+	# in any system are treated as systems of their own. the tree is rebuilt whenever the field changes;
+	# when bodies on rails only moved, the nodes' centers and spheres of influence are brought up to date instead
+	def __init__(self, field, systems, theta = .5, cluster_size = 4):
+		self.field = field
+		self.systems = systems
+		self.theta = theta
+		self.cluster_size = cluster_size
+		self.version = None
+		self.moves = None
+		self.current = None # the body whose soi the last lookup was in, None outside all of them
+		self.transitions = 0 # how often current changed
+		self.terms = 0 # bodies and branches summed by the last lookup
+	def __getattr__(self, name):
+		return getattr(self.field, name)
+	def __len__(self):
+		return len(self.field)
+	def build(self):
+		nodes = [system_node(system) for system in self.systems]
+		in_systems = set()
+		for system in self.systems:
+			in_systems.update(id(body) for body in system.bodies())
+		nodes += [GravityNode(body) for body in self.field.bodies if id(body) not in in_systems]
+		self.root = GravityNode(None, cluster(nodes, self.cluster_size))
+		self.root.refresh()
+		set_soi(self.root, self.theta)
+		self.version = self.field.version
+		self.moves = self.field.moves
+	def calc_force(self, other_pos, mass):
+		if self.version != self.field.version:
+			self.build()
+		elif self.moves != self.field.moves:
+			self.root.refresh()
+			set_soi(self.root, self.theta)
+			self.moves = self.field.moves
+		x = other_pos[0]
+		y = other_pos[1]
+		fx = 0.0
+		fy = 0.0
+		terms = 0
+		current = None
+		pull = 0.0
+		stack = list(self.root.children)
+		while stack:
+			node = stack.pop()
+			dx = node.cx - x
+			dy = node.cy - y
+			d2 = dx*dx + dy*dy
+			inside = d2 < node.soi*node.soi
+			if inside and node.body != None and node.body.mass > pull*d2:
+				current = node.body
+				pull = node.body.mass/d2
+			if inside and node.children:
+				# open it: the central body exactly, the children on their own
+				stack += node.children
+				if node.body == None:
+					continue
+				m = node.body.mass
+			else:
+				# the whole branch at its center of mass
+				m = node.mass
+				dx = node.x - x
+				dy = node.y - y
+				d2 = dx*dx + dy*dy
+			f = (self.field.g*m)/(d2*sqrt(d2))
+			fx += f*dx
+			fy += f*dy
+			terms += 1
+		if current is not self.current:
+			self.current = current
+			self.transitions += 1
+		self.terms = terms
+		return Vector2(fx*mass, fy*mass)
@@ -0,0 +1,141 @@
+# coding: utf-8
+from math import sqrt, ceil
+import numpy as np
+
+from scene import Vector2
+
+from integrators import angular_friction
+from orbits import periapsis, propagate
+
+class TimeWarp (object):
+	# fast forwards the ship while it's coasting.
+	# each game tick moves the ship factor ticks ahead. when one body dominates its gravity, the ship is moved
+	# along its kepler orbit around that body in one go; near a sphere of influence boundary, a predicted collision
+	# with that body or any other body close to the arc (where it'll be, for bodies on rails) it falls back to
+	# stepping the ship normally.
+	# any input or contact drops out of warp.
+	factors = (1, 10, 100, 1000)
+	def __init__(self, game, max_perturbation = .02, sample_length = 1000.0, max_samples = 64):
+		self.game = game
+		self.factor = 1
+		self.max_perturbation = max_perturbation # pull of all other bodies relative to the dominant one
+		self.sample_length = sample_length # about how far apart the arc is checked for other bodies
+		self.max_samples = max_samples
+		self.analytic_ticks = 0
+		self.numeric_ticks = 0
+	@property
+	def active(self):
+		return self.factor > 1
+	def cycle(self):
+		i = self.factors.index(self.factor) if self.factor in self.factors else 0
+		self.factor = self.factors[(i + 1) % len(self.factors)]
+	def stop(self):
+		self.factor = 1
+	def coasting(self, ship):
+		return not ship.accelerating and ship.a_angle == 0 and not ship.landed
+	def step(self, ship, dt = 1.0):
+		# one game tick of dt reference ticks
+		if self.active and not self.coasting(ship):
+			self.stop()
+		# bodies on rails move with the game time, before the ship so it sees them where they are now
+		if not self.active:
+			self.game.advance_time(dt)
+			ship.step(dt = dt)
+			return
+		if self.propagate(ship, self.factor*dt):
+			self.game.advance_time(self.factor*dt)
+			self.analytic_ticks += 1
+			return
+		self.numeric_ticks += 1
+		for i in range(self.factor):
+			self.game.advance_time(dt)
+			ship.step(dt = dt)
+			if ship.landed:
+				self.stop()
+				break
+	def propagate(self, ship, t):
+		# moves the ship t reference ticks along its orbit. returns False if it can't be done analytically
+		gravity = self.game.gravity
+		m = ship.give_movement()
+		body, perturbation = gravity.dominant(m.position, ship.mass)
+		if body == None or perturbation > self.max_perturbation:
+			return False
+		if body.path != None:
+			# the conic is around a body that stands still
+			return False
+		mu = gravity.g*ship.mass*body.mass
+		rx = m.position.x - body.position.x
+		ry = m.position.y - body.position.y
+		vx = m.velocity.x
+		vy = m.velocity.y
+		distance, time = periapsis(rx, ry, vx, vy, mu)
+		if distance < body.radius + ship.bound_radius and time != None and time <= t:
+			return False
+		end = self.sweep(ship, body, rx, ry, vx, vy, mu, t, max(distance, body.radius))
+		if end == None:
+			return False
+		rx, ry, vx, vy = end
+		position = body.position + Vector2(rx, ry)
+		end_body, end_perturbation = gravity.dominant(position, ship.mass)
+		if end_body is not body or end_perturbation > self.max_perturbation:
+			return False
+		r = sqrt(rx*rx + ry*ry)
+		acceleration = Vector2(-rx, -ry)*(mu/(r*r*r))
+		angle, v_a = self.spin_down(m.a_position, m.a_velocity, t)
+		ship.previous_movement = m
+		ship.set_movement(m.__class__(position, Vector2(vx, vy), acceleration, angle, v_a, 0))
+		return True
+	def sweep(self, ship, body, rx, ry, vx, vy, mu, t, closest):
+		# the state after t ticks on the conic, or None if the ship would come within reach of any other body on the way.
+		# the arc is sampled; between two samples the ship moves at most v_max times their time apart, so it stays
+		# inside the circle of half that around the midpoint of the chord. v_max is the speed at closest, the nearest
+		# the orbit gets to body, and every such circle is checked against the spatial index.
+		# bodies on rails are checked where their paths put them at the sample times instead. with samples close
+		# enough that a path turns at most a quarter between two, a body stays within its chord's length of the
+		# chord's midpoint, plus as much again for the chord of the body it goes around if that moves too
+		speed2 = vx*vx + vy*vy
+		alpha = 2.0/sqrt(rx*rx + ry*ry) - speed2/mu
+		v_max = sqrt(max(mu*(2.0/closest - alpha), speed2))
+		samples = max(int(ceil(v_max*t/self.sample_length)), 1)
+		rails = self.game.rails
+		if len(rails):
+			samples = max(samples, int(ceil(4*t*max(abs(b.path.speed) for b in rails.bodies))))
+			if samples > self.max_samples:
+				return None
+			radii = np.array([b.radius for b in rails.bodies])
+			before, progress = rails.positions(self.game.time)
+			centers = rails.center_index
+		samples = min(samples, self.max_samples)
+		reach = v_max*t/samples/2.0 + ship.bound_radius
+		spatial = self.game.spatial
+		bx = body.position.x
+		by = body.position.y
+		px = rx
+		py = ry
+		for i in range(1, samples + 1):
+			end = propagate(rx, ry, vx, vy, mu, t*i/float(samples))
+			x = bx + (px + end[0])/2.0
+			y = by + (py + end[1])/2.0
+			for other in spatial.query_circle(x, y, reach):
+				if other is not body and other.path == None:
+					return None
+			if len(rails):
+				after, progress = rails.positions(self.game.time + t*i/float(samples))
+				d = (before + after)/2.0 - (x, y)
+				chords = np.hypot(after[:, 0] - before[:, 0], after[:, 1] - before[:, 1])
+				pad = chords + np.where(centers >= 0, chords[centers], 0) + radii + reach
+				if (np.einsum("ij,ij->i", d, d) <= pad*pad).any():
+					return None
+				before = after
+			px = end[0]
+			py = end[1]
+		return end
+	def spin_down(self, angle, v_a, t):
+		# the ship's leftover spin slows down by angular_friction per reference tick until it stops
+		if v_a == 0:
+			return angle, 0
+		sign = 1 if v_a > 0 else -1
+		stop = abs(v_a)/angular_friction
+		if t >= stop:
+			return angle + v_a*stop/2.0, 0
+		return angle + v_a*t - sign*angular_friction*t*t/2.0, v_a - sign*angular_friction*t
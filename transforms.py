@@ -0,0 +1,36 @@
+# coding: utf-8
+from math import sin, cos
+import numpy as np
+from scene import Point
+
+class RigidTransform (object):
+	# rotation by angle followed by a translation to (x, y); maps local (object) space to world space
+	__slots__ = ("x", "y", "angle", "c", "s", "_matrix")
+	def __init__(self, x, y, angle):
+		self.x = x
+		self.y = y
+		self.angle = angle
+		self.c = cos(angle)
+		self.s = sin(angle)
+		self._matrix = None
+	def apply_point(self, px, py):
+		c = self.c
+		s = self.s
+		return Point(self.x + c*px - s*py, self.y + s*px + c*py)
+	def apply(self, points):
+		# local (x, y) pairs to a list of world Points
+		c = self.c
+		s = self.s
+		x = self.x
+		y = self.y
+		return [Point(x + c*px - s*py, y + s*px + c*py) for px, py in points]
+	def apply_array(self, points):
+		# local (N, 2) array to a world (N, 2) array
+		if self._matrix is None:
+			self._matrix = np.array(((self.c, self.s), (-self.s, self.c)))
+		return np.dot(points, self._matrix) + (self.x, self.y)
+	def inverse_point(self, wx, wy):
+		# world to local
+		dx = wx - self.x
+		dy = wy - self.y
+		return self.c*dx + self.s*dy, -self.s*dx + self.c*dy
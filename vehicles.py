@@ -7,10 +7,18 @@ from basic_objects import *
 from contexts import *
 from global_constants import *
 from vector_operations import *
+from integrators import *
+from collision import *
+from transforms import *
+from particles import *
+import imageanalysis
+from bitmask import RotatedMasks
+from render import *
+import numpy as np
 
 valid_landing_angle = 2*pi*(5.0/360.0)
 planet_land_delay = 10 # number of frames touching a planet before considered landed on that planet
-deltat_for_impulse = 1/60.0
+deltat_for_impulse = 1/60.0 # length of one reference tick in seconds; physics constants are per reference tick
 bouncespeed = .6
 
 class Vehicle (DrawableGameObject):
@@ -20,22 +28,6 @@ class Vehicle (DrawableGameObject):
 	def get_context(self):
 		return self.context	
 													
-class Flame (object):
-	def __init__(self, x, y, direction):
-		self.position = Point(x, y)
-		self.color = (1.0, .32, .08)
-		self.speed = 4 + random.random()*2
-		self.radius = 15
-		self.direction = direction
-	def draw(self):
-		self.position += self.direction*self.speed
-		self.radius -= .5
-		decay = .95
-		self.color = (self.color[0]*decay, self.color[1]*decay, self.color[2]*decay)
-		stroke_weight(0)
-		fill(self.color)
-		ellipse(self.position.x - self.radius, self.position.y - self.radius, self.radius*2, self.radius*2)
-
 class Movement (object):
 	def __init__(self, pos, vel, acc, apos, avel, aacc):
 		self.position = pos
@@ -44,6 +36,61 @@ class Movement (object):
 		self.a_position = apos
 		self.a_velocity = avel
 		self.a_acceleration = aacc
+		self._pose = None
+		self._transform = None
+		self.cache = {}
+	@property
+	def transform(self):
+		# local to world transform for this position and angle, built once and kept until either changes.
+		# self.cache holds anything else derived from the pose (like the world space hull) and is emptied with it
+		pose = (self.position.x, self.position.y, self.a_position)
+		if pose != self._pose:
+			self._pose = pose
+			self._transform = RigidTransform(*pose)
+			self.cache = {}
+		return self._transform
+
+class ShipShape (object):
+	# everything about a ship's outline that doesn't depend on where the ship is, computed once per ship type
+	def __init__(self, size, hull, inertia = None):
+		# size is the side of the square sprite, hull the collision points in fractions of the sprite:
+		# (0, 0) is its bottom left corner, (1, 1) its top right.
+		# inertia is the moment of inertia per unit mass; by default the hull points' as equal point masses
+		self.size = size
+		h = size/2.0
+		corners = [(-h, -h), (h, -h), (-h, h), (h, h)]
+		# corners[2] corners[3]
+		# corners[0] corners[1]
+		self.quad = [corners[0], corners[1], corners[2], corners[1], corners[2], corners[3]]
+		u = [Point(0, 0), Point(1, 0), Point(0, 1), Point(1, 1)]
+		self.uverts = [u[0], u[1], u[2], u[1], u[2], u[3]]
+		self.hull = [(-h + size*x, -h + size*y) for x, y in hull]
+		self.hull_array = np.array(self.hull, dtype = float)
+		# radius of the circle around the ship's center that holds the whole collision hull
+		self.bound_radius = max(sqrt(x*x + y*y) for x, y in self.hull)
+		if inertia == None:
+			inertia = sum(x*x + y*y for x, y in self.hull)/float(len(self.hull))
+		self.inertia = inertia
+		self.centroid = None
+		self.area_inertia = None
+	@classmethod
+	def from_sprite(cls, image, size, budget = 11, inertia = None):
+		# the hull, centroid and area inertia imageanalysis found in the sprite's alpha (cached, see graphics/hulls.json).
+		# unless inertia is given, the ship's is the opaque area's, as a plate of even density turning around the
+		# sprite's center rather than the hull points'
+		analysis = imageanalysis.load(image, budget)
+		shape = cls(size, analysis["hull"], inertia)
+		cx, cy = analysis["centroid"]
+		shape.centroid = (-size/2.0 + size*cx, -size/2.0 + size*cy)
+		# per unit mass of the opaque area about its centroid
+		shape.area_inertia = analysis["inertia"]*size*size
+		if inertia == None:
+			# moved from the centroid to the center the ship turns around
+			cx, cy = shape.centroid
+			shape.inertia = shape.area_inertia + cx*cx + cy*cy
+		return shape
+	def moment_of_inertia(self, mass):
+		return mass*self.inertia
 												
 class Collision (object):
 	def __init__(self, collision_pt, planet, position):
@@ -52,6 +99,8 @@ class Collision (object):
 		self.position = position
 												
 class Ship (Vehicle):
+	image = "graphics/spaceship.png"
+	shape = ShipShape.from_sprite(image, 100)
 	def __init__(self, game, x, y):
 		self.position = Point(x, y)
 		self.velocity = Vector2(0, 0)
@@ -65,19 +114,30 @@ class Ship (Vehicle):
 		buttons.append(Button(game.bounds.w*.9, game.bounds.h*.1, self.accelerate))
 		buttons.append(Button(game.bounds.w*.1, game.bounds.h*.1, self.rotate_left))
 		buttons.append(Button(game.bounds.w*.2, game.bounds.h*.1, self.rotate_right))
+		buttons.append(Button(game.bounds.w*.8, game.bounds.h*.1, self.time_warp, diameter = 60, draw = self.draw_time_warp_button))
 		self.landed = 0
 		self.planet_landed = None
 		self.thrust_force = .1
 		self.rotate_force = .003
+		self.bouncespeed = bouncespeed
+		self.planet_land_delay = planet_land_delay
+		self.valid_landing_angle = valid_landing_angle
 		self.game = game
 		self.context = GameContext(buttons)
-		self.flames = []
-		# calculate moment of inertia
-		i = 0
-		collision = self.get_collision()
-		for v in collision:
-			i += (self.mass/float(len(collision)))*(abs(v - self.position)**2.0)
-		self.m_i = i
+		self.flames = ParticlePool(256)
+		self.debug_points = []
+		self.debug_lines = []
+		self.collisions = []
+		self.previous_movement = None
+		self.integrator = SemiImplicitEuler()
+		self.predictor = None # a TrajectoryPredictor for the debug overlay
+		self.masks = None # RotatedMasks for pixel accurate contact, see use_masks
+		self._movement = None
+		self.m_i = self.shape.moment_of_inertia(self.mass)
+		self.bound_radius = self.shape.bound_radius
+	def use_masks(self, rotations = 256):
+		# also test planets against the sprite's pixels, for edges that pass between the hull points
+		self.masks = RotatedMasks(self.image, self.shape.size, rotations)
 	@property
 	def up(self):
 		return rotate(Vector2(0, 1), self.angle)
@@ -97,6 +157,18 @@ class Ship (Vehicle):
 			self.a_angle = -self.rotate_force
 		else:
 			self.a_angle = 0
+	def time_warp(self, state):
+		if state:
+			self.game.time_warp.cycle()
+	def draw_time_warp_button(self, x, y, diameter, active, pressed):
+		stroke(0, 0, 0)
+		stroke_weight(2)
+		if pressed:
+			fill(.2, .2, .9)
+		else:
+			fill(.1, .1, .7)
+		ellipse(x - diameter/2.0, y - diameter/2.0, diameter, diameter)
+		text("x%d" % self.game.time_warp.factor, x = x, y = y, font_size = 14)
 	def get_context(self):
 		return self.context
 	@property
@@ -119,77 +191,75 @@ class Ship (Vehicle):
 			self.velocity += self.acceleration
 			self.position += self.velocity
 	"""
-	def get_vertices(self, m = None):
+	def get_transform(self, m = None):
 		if m == None:
-			c = cos(self.angle)
-			s = sin(self.angle)
-		else:
-			c = cos(m.a_position)
-			s = sin(m.a_position)
-		crop = Rect(0, 0, 1, 1)
-		u = [Point(crop.min_x, crop.min_y), Point(crop.max_x, crop.min_y), Point(crop.min_x, crop.max_y), Point(crop.max_x, crop.max_y)]
-		
-		size = 100
-		crop.center(Point(0, 0))
-		landed_pos = (crop.h)*size
-
-		r = [Point(crop.min_x*size, crop.min_y*size), Point(crop.max_x*size, crop.min_y*size), Point(crop.min_x*size, crop.max_y*size), Point(crop.max_x*size, crop.max_y*size)]
-		# r[2] r[3]
-		# r[0] r[1]
-		verts = [r[0], r[1], r[2], r[1], r[2], r[3]]
-		uverts = [u[0], u[1], u[2], u[1], u[2], u[3]]
+			m = self.give_movement()
+		return m.transform
+	def get_vertices(self, m = None):
 		if m == None:
 			m = self.give_movement()
-		for i, v in enumerate(verts):
-			verts[i] = Point(m.position.x + c*v[0] - s*v[1], m.position.y + s*v[0] + c*v[1])
-		return verts, uverts
+		t = m.transform
+		verts = m.cache.get("verts")
+		if verts == None:
+			verts = m.cache["verts"] = t.apply(self.shape.quad)
+		return verts, self.shape.uverts
 	def get_collision(self, m = None):
-		v, _ = self.get_vertices(m)
-		collision = []
-		origin = v[0]
-		width = v[1]-v[0]
-		height = v[2]-v[0]
-		collision = [Point(0.41, 0.07), Point(0.22, 0.09), Point(0.62, 0.07), Point(0.80, 0.09), Point(0.95, 0.33), Point(0.04, 0.32), Point(0.49, 0.97), Point(0.55, 0.95), Point(0.44, 0.94), Point(0.24, 0.64), Point(0.78, 0.62)]
-		for i, c in enumerate(collision):
-			collision[i] = origin + width*c.x + height*c.y
+		if m == None:
+			m = self.give_movement()
+		t = m.transform
+		collision = m.cache.get("hull")
+		if collision == None:
+			collision = m.cache["hull"] = t.apply(self.shape.hull)
+		return collision
+	def get_collision_array(self, m = None):
+		# the world space hull as an (N, 2) array
+		if m == None:
+			m = self.give_movement()
+		t = m.transform
+		collision = m.cache.get("hull array")
+		if collision is None:
+			collision = m.cache["hull array"] = t.apply_array(self.shape.hull_array)
 		return collision
 	def give_movement(self):
-		return Movement(self.position, self.velocity, self.acceleration, self.angle, self.v_angle, self.a_angle)
+		# the movement set last is handed out again while nothing changed, so what it cached stays valid
+		mv = self._movement
+		if mv != None and mv.position is self.position and mv.velocity is self.velocity and mv.acceleration is self.acceleration \
+			and mv.a_position == self.angle and mv.a_velocity == self.v_angle and mv.a_acceleration == self.a_angle:
+			return mv
+		mv = self._movement = Movement(self.position, self.velocity, self.acceleration, self.angle, self.v_angle, self.a_angle)
+		return mv
 	def set_movement(self, m):
+		self._movement = m
 		self.position = m.position
 		self.velocity = m.velocity
 		self.acceleration = m.acceleration
 		self.angle = m.a_position
 		self.v_angle = m.a_velocity
 		self.a_angle = m.a_acceleration
-	def update(self, m):
-		pos = m.position
-		vel = m.velocity
-		acc = m.acceleration
-		p_a = m.a_position
-		v_a = m.a_velocity
-		a_a = m.a_acceleration
-		v_a += a_a
-		if a_a == 0 and v_a != 0:
-			friction = .005
-			sign = abs(v_a)/v_a
-			v_a += -sign*min(abs(v_a), friction)
-		if abs(v_a) < .0001:
-			v_a = 0
-		p_a += v_a
-		acc = Vector2(0, 0)
+	def update(self, m, dt = 1.0):
+		# dt is the length of the tick in reference ticks (deltat_for_impulse seconds)
+		return self.integrator.step(self, m, dt)
+	def thrust(self, angle):
 		if self.accelerating:
-			acc += Vector2(sin(-p_a), cos(-p_a))*self.thrust_force
-		for celestial in self.game.celestials:
-			acc += celestial.calc_force(pos, self.mass)
-		vel += acc
-		pos += vel
-		return Movement(pos, vel, acc, p_a, v_a, a_a)
-	def drawobject(self, update = True):
+			return Vector2(sin(-angle), cos(-angle))*self.thrust_force
+		return Vector2(0, 0)
+	def gravity(self, pos):
+		p = self.game.profiler
+		if p:
+			p.start("gravity")
+			force = self.game.gravity.calc_force(pos, self.mass)
+			p.stop("gravity")
+			p.count("gravity calls")
+			return force
+		return self.game.gravity.calc_force(pos, self.mass)
+	def gravity_timescale(self, pos):
+		return self.game.gravity.timescale(pos, self.mass)
+	def step(self, update = True, dt = 1.0):
+		# one tick of physics and planet contact, without drawing anything
 		m = self.give_movement()
-		mu = self.update(m)
+		mu = self.update(m, dt)
+		deltat = deltat_for_impulse*dt
 		pos = mu.position
-		verts = self.get_collision(mu)
 		pts = []
 		lines = []
 		hit = False
@@ -197,73 +267,105 @@ class Ship (Vehicle):
 		
 		collisions = []
 		
-		for celestial in self.game.celestials:
+		p = self.game.profiler
+		if p:
+			p.start("collision")
+		# broadphase: only the celestials that can touch any hull point, last frame's or this frame's
+		reach = self.bound_radius + abs(mu.position - m.position)
+		candidates = self.game.spatial.query_circle(mu.position.x, mu.position.y, reach)
+		if p:
+			p.count("bodies tested", len(candidates))
+		if candidates:
+			starts = self.get_collision_array(m)
+			ends = self.get_collision_array(mu)
+		for celestial in candidates:
 			r = celestial.radius
 			cpos = celestial.position
-			for v in verts:
-				if abs(v - cpos) <= r:
-					hit = True # we're landed
-					planet = celestial
-					# first, calculate where the ship hit on the planet:
-					
-					# v is the collision point that hit the planet, so get the location of that point last frame
-					i = verts.index(v)
-					oldv = self.get_collision(m)[i]
-					pts.append(oldv) # and draw it for debug purposes
-						
-					vec = v - oldv
-					moved_by = abs(vec) # how much the point that intersected moved
-					vec = vec/moved_by
-					to_center = mu.position - v
-					# rotate vec by 90 degrees (counterclockwise)
-					rvec = Vector2(-vec.y, vec.x)
-					
-					# some magic math that works for some reason (find the intersection point of a ray with a circle)
-					r_section, move = solve(cpos, rvec, v, vec)
-					halfchord = sqrt(r**2.0 - r_section**2.0)
-					collision_pt = v + vec*(move - halfchord) # go backwards (?) from the new position to the surface of the planet
-					
-					pts.append((collision_pt, (1, 0, 0))) # draw the point on the surface in red
-					pts.append(v)
-					#lines.append([cpos, cpos + rvec*r_section])
-					#lines.append([v, v + vec*move])
-					
-					# calculate reflection vector for bounce (fix it though, it's crap.....)
-					normal = collision_pt - cpos
-					lines.append([cpos, cpos + normal])
-					normal = normal/abs(normal)
-					bounce = reflect(vec*abs(mu.velocity), normal)
-					
-					# set the kinematics for next frame # change for actual physics
-					if abs(bounce) > 100:
-						deltav = abs(bounce*bouncespeed - mu.velocity)
-					else:
-						deltav = abs(mu.velocity)
-					
-					# torque and angular kinematics
-					force = normal*((self.mass*deltav)/deltat_for_impulse)	
-					torque = cross(force, -1*to_center)
-					a_accel = torque/self.m_i
-					mu.a_velocity += -a_accel*deltat_for_impulse
-					
-					# linear kinematics
-					# F*∆t = m*∆v
-					force = abs(force)
-					forcenormal = mu.position - cpos
-					lines.append([cpos, cpos + forcenormal, (0,1,0)])
-					forcenormal = forcenormal/abs(forcenormal)
-					mu.velocity += forcenormal*((force*deltat_for_impulse)/float(self.mass))
-					
-					#mu.velocity = bounce*.7
-					mu.position = collision_pt + to_center
-					if debug and self.game.debug_info and self.game.debug_info.should_pause:
-						if self.game.debug_info.advance != 0:
-							break
-						self.game.debug_mode = True
-						self.game.debug_info.paused = True
-						update = False			
-					break
+			body_starts = starts
+			body_velocity = Vector2(0, 0)
+			if celestial.path != None:
+				# a body on rails moved this tick as well: work in its frame, with last frame's hull carried
+				# along by the body's move
+				body_velocity = self.game.rails.velocity(celestial, self.game.time, dt)
+				body_starts = starts + (body_velocity.x*dt, body_velocity.y*dt)
+			# sweep every hull point from last frame's position to this frame's against the planet,
+			# so fast points can't pass through it between frames
+			contact = first_contact(body_starts, ends, (cpos.x, cpos.y), r)
+			if contact != None:
+				i, toi, collision_pt, contact_normal = contact
+				# v is the collision point that hit the planet, oldv the location of that point last frame
+				v = Point(float(ends[i][0]), float(ends[i][1]))
+				oldv = Point(float(body_starts[i][0]), float(body_starts[i][1]))
+			elif self.masks != None:
+				# the planet may still reach in between the hull points: look for it in the ship's pixels
+				deepest = self.masks.contact((mu.position.x, mu.position.y), mu.a_position, (cpos.x, cpos.y), r)
+				if deepest == None:
+					continue
+				v = Point(deepest[0], deepest[1])
+				oldv = m.transform.apply_point(*mu.transform.inverse_point(v.x, v.y)) + body_velocity*dt
+				contact_normal = (v - cpos)/abs(v - cpos)
+				collision_pt = cpos + contact_normal*r
+			else:
+				continue
+			hit = True # we're landed
+			planet = celestial
+			pts.append(oldv) # and draw it for debug purposes
+				
+			vec = v - oldv
+			moved_by = abs(vec) # how much the point that intersected moved
+			if moved_by > 0:
+				vec = vec/moved_by
+			to_center = mu.position - v
+			# where the point's path entered the planet
+			collision_pt = Point(collision_pt[0], collision_pt[1])
+			
+			pts.append((collision_pt, (1, 0, 0))) # draw the point on the surface in red
+			pts.append(v)
+			
+			# calculate reflection vector for bounce (fix it though, it's crap.....)
+			normal = Vector2(contact_normal[0], contact_normal[1])
+			lines.append([cpos, cpos + normal*r])
+			# with the velocity relative to the body, so a moving planet hits the ship as well
+			velocity = mu.velocity - body_velocity
+			bounce = reflect(vec*abs(velocity), normal)
+			
+			# set the kinematics for next frame # change for actual physics
+			if abs(bounce) > 100:
+				deltav = abs(bounce*self.bouncespeed - velocity)
+			else:
+				deltav = abs(velocity)
+			
+			# torque and angular kinematics
+			force = normal*((self.mass*deltav)/deltat)	
+			torque = cross(force, -1*to_center)
+			a_accel = torque/self.m_i
+			mu.a_velocity += -a_accel*deltat
+			
+			# linear kinematics
+			# F*∆t = m*∆v
+			force = abs(force)
+			# move the ship back so the point that hit sits on the surface
+			mu.position = collision_pt + to_center
+			# and push away from the body from there: the end of the tick may be through a small body already,
+			# and pushing from there would send the ship on through, faster every tick
+			forcenormal = mu.position - cpos
+			lines.append([cpos, cpos + forcenormal, (0,1,0)])
+			if abs(forcenormal) > 0:
+				forcenormal = forcenormal/abs(forcenormal)
+			else:
+				forcenormal = normal
+			mu.velocity += forcenormal*((force*deltat)/float(self.mass))
+			
+			#mu.velocity = bounce*.7
+			collisions.append(Collision(collision_pt, celestial, mu.position))
+			if debug and self.game.debug_info and self.game.debug_info.should_pause:
+				if self.game.debug_info.advance == 0:
+					self.game.debug_mode = True
+					self.game.debug_info.paused = True
+					update = False
 		
+		if p:
+			p.stop("collision")
 		if len(collisions) > 0:
 			# we hit something
 			pass
@@ -279,7 +381,7 @@ class Ship (Vehicle):
 			
 		
 		######## ACTUAL CRAP HAPPENS HERE
-		if self.landed > planet_land_delay and self.planet_landed == None:
+		if self.landed*dt > self.planet_land_delay and self.planet_landed == None:
 			self.planet_landed = planet
 			self.game.landed_on(self.planet_landed)
 		
@@ -294,30 +396,64 @@ class Ship (Vehicle):
 														
 		lines.append([mu.position, mu.position + mu.velocity*10,(1,0,0)])
 		if update:
+			self.previous_movement = m
 			self.set_movement(mu)
-		self.draw_ship()
+		self.collisions = collisions
+		self.debug_points = pts
+		self.debug_lines = lines
+	def interpolated_movement(self, alpha):
+		# the state alpha of the way from the previous tick to the current one
+		m = self.give_movement()
+		p = self.previous_movement
+		if p == None or alpha >= 1:
+			return m
+		position = p.position + (m.position - p.position)*alpha
+		velocity = p.velocity + (m.velocity - p.velocity)*alpha
+		angle = p.a_position + (m.a_position - p.a_position)*alpha
+		return Movement(position, velocity, m.acceleration, angle, m.a_velocity, m.a_acceleration)
+	def render(self, alpha = 1.0):
+		self.draw_ship(self.interpolated_movement(alpha))
 		if debug:
-			fill(1)
-			stroke_weight(0)
-			for pt in pts:
-				if isinstance(pt, Vector2):
-					fill(1)
-					ellipse(pt.x - 2, pt.y - 2, 4, 4)
-				else:
-					fill(pt[1])
-					ellipse(pt[0].x - 2, pt[0].y - 2, 4, 4)
-			stroke_weight(1)
-			stroke(1)
-			for l in lines:
-				if len(l) == 3:
-					stroke(l[2])
-				else:
-					stroke(1,1,1)
-				line(l[0].x, l[0].y, l[1].x, l[1].y)
+			layer(debug_layer)
+			self.draw_debug()
+			layer(ship_layer)
+	def drawobject(self, update = True):
+		self.step(update)
+		self.render()
+	def draw_debug(self):
+		if self.predictor != None:
+			self.predictor.update()
+			self.predictor.draw()
+		pts = self.debug_points
+		lines = self.debug_lines
+		fill(1)
+		stroke_weight(0)
+		for pt in pts:
+			if isinstance(pt, Vector2):
+				fill(1)
+				ellipse(pt.x - 2, pt.y - 2, 4, 4)
+			else:
+				fill(pt[1])
+				ellipse(pt[0].x - 2, pt[0].y - 2, 4, 4)
+		stroke_weight(1)
+		stroke(1)
+		for l in lines:
+			if len(l) == 3:
+				stroke(l[2])
+			else:
+				stroke(1,1,1)
+			line(l[0].x, l[0].y, l[1].x, l[1].y)
 	def draw(self):
 		self.drawobject(False)
-	def draw_ship(self):
-		verts, uverts = self.get_vertices()
+	def draw_ship(self, m = None):
+		if m == None:
+			m = self.give_movement()
+		angle = m.a_position
+		verts, uverts = self.get_vertices(m)
+		xs = []
+		ys = []
+		dxs = []
+		dys = []
 		if self.accelerating:
 			leftbottom = Point(verts[0][0], verts[0][1])
 			rightbottom = Point(verts[1][0], verts[1][1])
@@ -325,27 +461,37 @@ class Ship (Vehicle):
 			leftthruster = leftbottom + bottomside*.3
 			rightthruster = leftbottom + bottomside*.7
 			for flamepos in [leftthruster, rightthruster]:
-				flamedir = Vector2(cos(self.angle - pi/2.0), sin(self.angle - pi/2.0))
-				self.flames.append(Flame(flamepos.x, flamepos.y, flamedir))
+				xs.append(flamepos.x)
+				ys.append(flamepos.y)
+				dxs.append(cos(angle - pi/2.0))
+				dys.append(sin(angle - pi/2.0))
 			
 		if self.a_angle != 0:
 			if self.a_angle < 0:
 				rightbottom = verts[1]
 				righttop = (verts[4] + verts[5])/2.0
 				right_anglethruster = (righttop + rightbottom*2)/3.0
-				flamedir = Vector2(cos(self.angle), sin(self.angle))
-				self.flames.append(Flame(right_anglethruster.x, right_anglethruster.y, flamedir))
+				xs.append(right_anglethruster.x)
+				ys.append(right_anglethruster.y)
+				dxs.append(cos(angle))
+				dys.append(sin(angle))
 			if self.a_angle > 0:
 				leftbottom = verts[0]
 				lefttop = (verts[4] + verts[5])/2.0
 				left_anglethruster = (lefttop + leftbottom*2)/3.0
-				flamedir = Vector2(cos(self.angle - pi), sin(self.angle - pi))
-				self.flames.append(Flame(left_anglethruster.x, left_anglethruster.y, flamedir))
-		for f in self.flames:
-			f.draw()
-			if f.radius <= 0:
-				self.flames.remove(f)
-				del f
+				xs.append(left_anglethruster.x)
+				ys.append(left_anglethruster.y)
+				dxs.append(cos(angle - pi))
+				dys.append(sin(angle - pi))
+		self.flames.emit(xs, ys, dxs, dys)
+		p = self.game.profiler
+		if p:
+			p.start("particles")
+		self.flames.update()
+		if p:
+			p.stop("particles")
+			p.count("particles", self.flames.count)
+		self.flames.draw()
 				
 		stroke_weight(0)
 		tint(1,1,1)
@@ -353,4 +499,4 @@ class Ship (Vehicle):
 		
 		#if debug:
 		#	triangle_strip(self.get_collision(self.give_movement()))
-		triangle_strip(verts, uverts, "graphics/spaceship.png")
+		triangle_strip(verts, uverts, self.image)
@@ -0,0 +1,58 @@
+# coding: utf-8
+from gravity import CelestialField, FieldCache
+from system_gravity import SystemGravity
+from rails import Rails
+from spatial import SpatialGrid
+
+class World (object):
+	# celestial bookkeeping shared by SpaceAdventure and the headless game.
+	# add and remove celestials through these methods so the gravity field and the spatial index stay in sync
+	profiler = None # a Profiler to time the phases of a frame in, None when off
+	def set_celestials(self, celestials):
+		self.celestials = list(celestials)
+		self.systems = [] # SolarSystems and PlanetMoonSystems whose bodies are in celestials
+		self.gravity = CelestialField(self.celestials)
+		self.spatial = SpatialGrid()
+		self.rails = Rails(self)
+		self.time = 0.0 # game time in reference ticks, which is what moves bodies on rails
+		for c in self.celestials:
+			self.spatial.add(c, c.position.x, c.position.y, c.radius)
+			if c.path != None:
+				self.rails.add(c)
+	def use_system_gravity(self):
+		# sum gravity over the system tree instead of over every body (see SystemGravity)
+		self.gravity = SystemGravity(self.gravity, self.systems)
+	def cache_gravity(self, **kwargs):
+		# look gravity up from precomputed tiles (see FieldCache). bodies on rails are summed exactly on every lookup
+		self.gravity = FieldCache(self.gravity, **kwargs)
+	def add_celestial(self, celestial):
+		self.celestials.append(celestial)
+		self.gravity.add(celestial)
+		self.spatial.add(celestial, celestial.position.x, celestial.position.y, celestial.radius)
+		if celestial.path != None:
+			self.rails.add(celestial)
+	def remove_celestial(self, celestial):
+		self.celestials.remove(celestial)
+		self.gravity.remove(celestial)
+		self.spatial.remove(celestial)
+		if celestial.path != None:
+			self.rails.remove(celestial)
+	def add_system(self, system):
+		self.systems.append(system)
+		for body in system.bodies():
+			self.add_celestial(body)
+	def remove_system(self, system):
+		self.systems.remove(system)
+		for body in system.bodies():
+			self.remove_celestial(body)
+	def moved_celestial(self, celestial):
+		self.gravity.update(celestial)
+		self.spatial.update(celestial, celestial.position.x, celestial.position.y, celestial.radius)
+	def advance_time(self, dt):
+		# moves the game time on by dt reference ticks and the bodies on rails with it.
+		# part of the physics tick: drawing only ever shows where they are
+		self.time += dt
+		self.rails.update(self.time)
+	def visible_celestials(self, rect):
+		# celestials whose bounding circle overlaps rect, in the order they were added
+		return self.spatial.query_rect(rect.min_x, rect.min_y, rect.max_x, rect.max_y)